@@ -3,22 +3,26 @@ import logging
 from telegram import BotCommand
 from config.config import Config
 from database.database import DatabaseHandler
+from database.async_database import AsyncDatabaseHandler
 from services.ai_generator import AIGenerator
 from controllers.access_controller import AccessController
 from services.content_manager import ContentManager
+from services.generation_worker import GenerationWorker
 from bot.telegram_bot import TelegramBot
 
 def main():
     db_handler = DatabaseHandler()
+    async_db_handler = AsyncDatabaseHandler(category_cache=db_handler.category_cache)
     ai_generator = AIGenerator()
-    access_controller = AccessController(db_handler)
+    access_controller = AccessController(async_db_handler)
     content_manager = ContentManager(db_handler, ai_generator)
+    generation_worker = GenerationWorker(content_manager)
     
     token = Config.get_telegram_token()
     if not token:
         return
     
-    bot = TelegramBot(token, access_controller, content_manager)
+    bot = TelegramBot(token, access_controller, content_manager, generation_worker, async_db_handler)
     
     async def set_commands():
         commands = [
@@ -0,0 +1,69 @@
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from typing import Dict, List
+from database.async_database import AsyncDatabaseHandler
+
+logger = logging.getLogger(__name__)
+
+_PEXELS_PHOTO = re.compile(r'^https?://images\.pexels\.com/photos/(\d+)/')
+
+def media_key(url: str) -> str:
+    """Stable key for a media URL: the Pexels photo id when there is one, else a hash of the URL."""
+    match = _PEXELS_PHOTO.match(url)
+    if match:
+        return f"pexels:photo:{match.group(1)}"
+    return f"url:{hashlib.sha1(url.encode('utf-8')).hexdigest()}"
+
+class FileIdCache:
+    """Telegram file_ids of media already uploaded once, so they can be resent without a download.
+
+    Kept in memory (LRU) in front of the telegram_files table.
+    """
+
+    def __init__(self, db_handler: AsyncDatabaseHandler, max_entries: int = 10000):
+        self.db_handler = db_handler
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+
+    def _remember(self, key: str, file_id: str):
+        self._memory[key] = file_id
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get_many(self, urls: List[str]) -> Dict[str, str]:
+        """Return {url: file_id} for the URLs that were uploaded before."""
+        keys = {url: media_key(url) for url in urls}
+        missing = [key for key in keys.values() if key not in self._memory]
+        if missing:
+            try:
+                for key, file_id in (await self.db_handler.get_telegram_file_ids(missing)).items():
+                    self._remember(key, file_id)
+            except Exception as e:
+                # Without the cache we just send by URL
+                logger.warning(f"Could not load Telegram file ids: {e}")
+        return {url: self._memory[key] for url, key in keys.items() if key in self._memory}
+
+    async def save(self, file_ids: Dict[str, str]):
+        """Store {url: file_id} after an upload."""
+        if not file_ids:
+            return
+        by_key = {media_key(url): file_id for url, file_id in file_ids.items()}
+        for key, file_id in by_key.items():
+            self._remember(key, file_id)
+        try:
+            await self.db_handler.save_telegram_file_ids(by_key)
+        except Exception as e:
+            logger.warning(f"Could not save Telegram file ids: {e}")
+
+    async def forget(self, urls: List[str]):
+        """Drop file_ids Telegram rejected, so the next send uploads by URL again."""
+        keys = [media_key(url) for url in urls]
+        for key in keys:
+            self._memory.pop(key, None)
+        try:
+            await self.db_handler.delete_telegram_file_ids(keys)
+        except Exception as e:
+            logger.warning(f"Could not delete Telegram file ids: {e}")
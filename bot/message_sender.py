@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import re
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+from telegram import Bot, InputMediaPhoto
+from telegram.error import BadRequest, RetryAfter
+from bot.file_id_cache import FileIdCache
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+MAX_TEXT_LENGTH = 4096
+MAX_ALBUM_SIZE = 10
+_MARKDOWN_SPECIAL = re.compile(r'([_*`\[])')
+_MARKDOWN_FORMATTING = re.compile(r'\\([_*`\[])|[_*`]')
+
+def escape_markdown(text: str) -> str:
+    """Escape plain text so it can be merged into a legacy Markdown message."""
+    return _MARKDOWN_SPECIAL.sub(r'\\\1', text)
+
+def strip_markdown(text: str) -> str:
+    """Plain version of a legacy Markdown text: escapes undone, formatting markers dropped."""
+    return _MARKDOWN_FORMATTING.sub(lambda match: match.group(1) or '', text)
+
+def split_text(text: str, limit: int = MAX_TEXT_LENGTH) -> List[str]:
+    """Split text into chunks under the limit, preferring line and word boundaries."""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit)
+        if cut <= 0:
+            cut = text.rfind(' ', 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip('\n ')
+    if text:
+        chunks.append(text)
+    return chunks
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class OutboundBatch:
+    """Messages queued for one chat; consecutive texts are packed into as few messages as possible."""
+
+    def __init__(self, sender: 'MessageSender', chat_id: int):
+        self.sender = sender
+        self.chat_id = chat_id
+        self.items: List[Tuple[str, object]] = []
+
+    def text(self, text: str, markdown: bool = False) -> 'OutboundBatch':
+        if text:
+            self.items.append(('text', text if markdown else escape_markdown(text)))
+        return self
+
+    def photos(self, urls: List[str]) -> 'OutboundBatch':
+        if urls:
+            self.items.append(('photos', list(urls)))
+        return self
+
+    def _messages(self) -> List[Tuple[str, object]]:
+        messages = []
+        buffer = ''
+        for kind, payload in self.items:
+            if kind != 'text':
+                if buffer:
+                    messages.extend(('text', chunk) for chunk in split_text(buffer))
+                    buffer = ''
+                messages.append((kind, payload))
+                continue
+            candidate = f"{buffer}\n\n{payload}" if buffer else payload
+            if len(candidate) <= MAX_TEXT_LENGTH:
+                buffer = candidate
+            else:
+                messages.extend(('text', chunk) for chunk in split_text(buffer))
+                buffer = payload
+        if buffer:
+            messages.extend(('text', chunk) for chunk in split_text(buffer))
+        return messages
+
+    async def flush(self):
+        """Send everything queued, in order, then clear the batch."""
+        messages = self._messages()
+        self.items = []
+        async with self.sender.chat_lock(self.chat_id):
+            for kind, payload in messages:
+                if kind == 'text':
+                    await self.sender.send_text(self.chat_id, payload)
+                else:
+                    await self.sender.send_photos(self.chat_id, payload)
+
+class MessageSender:
+    """Outbound scheduler: paces each chat with a token bucket and retries on flood control."""
+
+    def __init__(self, bot: Bot, per_chat_rate: float = None, per_chat_burst: float = None, global_rate: float = None, max_retries: int = 3, file_ids: Optional[FileIdCache] = None):
+        self.bot = bot
+        self.file_ids = file_ids
+        self.per_chat_rate = per_chat_rate or Config.get_send_rate_per_chat()
+        self.per_chat_burst = per_chat_burst or Config.get_send_burst_per_chat()
+        global_rate = global_rate or Config.get_send_rate_global()
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.max_retries = max_retries
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+
+    def batch(self, chat_id: int) -> OutboundBatch:
+        return OutboundBatch(self, chat_id)
+
+    def chat_lock(self, chat_id: int) -> asyncio.Lock:
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            if len(self._chat_locks) > 10000:
+                self._chat_locks = {k: v for k, v in self._chat_locks.items() if v.locked()}
+            lock = self._chat_locks[chat_id] = asyncio.Lock()
+        return lock
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            if len(self._buckets) > 10000:
+                self._buckets.clear()
+            bucket = self._buckets[chat_id] = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+        return bucket
+
+    async def _call(self, chat_id: int, method, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            await self._bucket(chat_id).acquire()
+            await self.global_bucket.acquire()
+            try:
+                return await method(chat_id=chat_id, **kwargs)
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = e.retry_after
+                if isinstance(delay, timedelta):
+                    delay = delay.total_seconds()
+                logger.warning(f"Flood control in chat {chat_id}, retrying in {delay}s")
+                await asyncio.sleep(delay)
+
+    async def edit_text(self, chat_id: int, message_id: int, text: str):
+        """Replace a message's text (plain); an unchanged text is not an error."""
+        try:
+            return await self._call(chat_id, self.bot.edit_message_text, message_id=message_id, text=text[:MAX_TEXT_LENGTH])
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+
+    async def send_text(self, chat_id: int, text: str):
+        try:
+            return await self._call(chat_id, self.bot.send_message, text=text, parse_mode='Markdown')
+        except BadRequest as e:
+            if "parse entities" not in str(e).lower():
+                raise
+            # One malformed entity must not drop the whole packed message; send it as plain text,
+            # without the escapes (which would otherwise break URLs)
+            return await self._call(chat_id, self.bot.send_message, text=strip_markdown(text))
+
+    async def _send_album(self, chat_id: int, group: List[str], known: Dict[str, str]):
+        # Photos uploaded before are resent by file_id, so Telegram doesn't download them again
+        media = [known.get(url, url) for url in group]
+        if len(media) == 1:
+            messages = [await self._call(chat_id, self.bot.send_photo, photo=media[0])]
+        else:
+            messages = await self._call(chat_id, self.bot.send_media_group, media=[InputMediaPhoto(item) for item in media])
+        if self.file_ids:
+            uploaded = {url: message.photo[-1].file_id for url, message in zip(group, messages) if url not in known and message.photo}
+            await self.file_ids.save(uploaded)
+
+    async def send_photos(self, chat_id: int, urls: List[str]):
+        known = await self.file_ids.get_many(urls) if self.file_ids else {}
+        for start in range(0, len(urls), MAX_ALBUM_SIZE):
+            group = urls[start:start + MAX_ALBUM_SIZE]
+            try:
+                try:
+                    await self._send_album(chat_id, group, known)
+                except BadRequest:
+                    stale = [url for url in group if url in known]
+                    if not stale:
+                        raise
+                    # A cached file_id can stop working; retry the album by URL
+                    await self.file_ids.forget(stale)
+                    await self._send_album(chat_id, group, {})
+            except BadRequest as e:
+                logger.error(f"Error sending album to chat {chat_id}: {e}")
+                await self.send_text(chat_id, escape_markdown("\n".join(group)))
\ No newline at end of file
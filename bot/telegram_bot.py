@@ -4,6 +4,12 @@ from telegram import Update, BotCommand, InlineKeyboardMarkup, InlineKeyboardBut
 from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler, MessageHandler, filters
 from controllers.access_controller import AccessController
 from services.content_manager import ContentManager
+from services.generation_worker import GenerationWorker
+from bot.update_processor import ChatOrderedUpdateProcessor
+from bot.message_sender import MessageSender, escape_markdown
+from bot.file_id_cache import FileIdCache
+from database.async_database import AsyncDatabaseHandler
+from database.database import encode_cursor, decode_cursor
 from config.config import Config
 
 logger = logging.getLogger(__name__)
@@ -11,13 +17,24 @@ logger = logging.getLogger(__name__)
 class TelegramBot:
     """Main bot class."""
     
-    def __init__(self, token: str, access_controller: AccessController, content_manager: ContentManager):
+    def __init__(self, token: str, access_controller: AccessController, content_manager: ContentManager, generation_worker: GenerationWorker, db_handler: AsyncDatabaseHandler):
         self.token = token
         self.access_controller = access_controller
         self.content_manager = content_manager
-        self.application = Application.builder().token(token).build()
+        self.generation_worker = generation_worker
+        self.db_handler = db_handler
+        self.update_processor = ChatOrderedUpdateProcessor(Config.get_max_concurrent_updates())
+        self.application = (
+            Application.builder()
+            .token(token)
+            .concurrent_updates(self.update_processor)
+            .post_shutdown(self._on_shutdown)
+            .build()
+        )
+        self.sender = MessageSender(self.application.bot, file_ids=FileIdCache(db_handler))
         self.user_states = {}  
         self._setup_handlers()
+        self._schedule_metrics()
     
     def _setup_handlers(self):
         self.application.add_handler(CommandHandler("start", self.start))
@@ -26,9 +43,45 @@ class TelegramBot:
         self.application.add_handler(CallbackQueryHandler(self.handle_callback))
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
     
+    def _schedule_metrics(self):
+        interval = Config.get_update_metrics_interval()
+        if interval > 0 and self.application.job_queue:
+            self.application.job_queue.run_repeating(self._log_update_metrics, interval=interval, first=interval)
+    
+    async def _log_update_metrics(self, context: ContextTypes.DEFAULT_TYPE):
+        m = self.update_processor.metrics()
+        logger.info(
+            f"Updates: queued={m['queued']} in_flight={m['in_flight']}/{m['max_in_flight']} "
+            f"chats={m['active_chats']} processed={m['processed']} "
+            f"wait p50={m['wait_p50']:.3f}s p95={m['wait_p95']:.3f}s max={m['wait_max']:.3f}s"
+        )
+        p = self.content_manager.db_handler.pool.stats()
+        logger.info(
+            f"DB pool: open={p['open']}/{p['size']} idle={p['idle']} acquisitions={p['acquisitions']} "
+            f"waits={p['waits']} wait avg={p['wait_avg']:.3f}s max={p['wait_max']:.3f}s "
+            f"validations={p['validations']} replaced={p['replaced']}"
+        )
+        a = self.db_handler.stats()
+        logger.info(f"Async DB pool: open={a['size']}/{a['max']} free={a['free']}")
+        g = self.content_manager.ai_generator.stats()
+        logger.info(
+            f"Gemini: calls={g['calls']} prompt avg={g['prompt_tokens_avg']:.0f} tokens "
+            f"(cached {g['cached_tokens_avg']:.0f}) output avg={g['output_tokens_avg']:.0f} "
+            f"latency avg={g['latency_avg']:.2f}s hedged={g['hedged']} hedge_wins={g['hedge_wins']} "
+            f"retries={g['retries']} timeouts={g['timeouts']}"
+        )
+        l = g['limiter']
+        logger.info(
+            f"Gemini limiter: limit={l['limit']} in_flight={l['in_flight']} waiting={l['waiting']} "
+            f"waited={l['waited']}/{l['acquired']} overloads={l['overloads']} decreases={l['decreases']}"
+        )
+    
+    async def _on_shutdown(self, application: Application):
+        await self.db_handler.close()
+    
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
-        if not self.access_controller.has_access(user_id):
+        if not await self.access_controller.has_access(user_id):
             await update.message.reply_text("❌ No tienes acceso para usar este bot.\nComunícate con el desarrollador.")
             return
         
@@ -41,11 +94,11 @@ class TelegramBot:
     
     async def generar(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
-        if not self.access_controller.has_access(user_id):
+        if not await self.access_controller.has_access(user_id):
             await update.message.reply_text("❌ No tienes acceso para usar este bot.\nComunícate con el desarrollador.")
             return
         
-        categories = self.content_manager.db_handler.get_user_categories(user_id)
+        categories = await self.db_handler.get_user_categories(user_id)
         if not categories:
             await update.message.reply_text("No tienes categorías. Gestiona tus categorías primero con /start.")
             return
@@ -74,7 +127,7 @@ class TelegramBot:
         
         user_id = query.from_user.id
         
-        if not self.access_controller.has_access(user_id):
+        if not await self.access_controller.has_access(user_id):
             try:
                 await query.edit_message_text("❌ No tienes acceso para usar este bot.\nComunícate con el desarrollador.")
             except Exception:
@@ -94,7 +147,7 @@ class TelegramBot:
                 pass
         
         elif data == "generate":
-            categories = self.content_manager.db_handler.get_user_categories(user_id)
+            categories = await self.db_handler.get_user_categories(user_id)
             if not categories:
                 try:
                     await query.edit_message_text("No tienes categorías. Gestiona tus categorías primero con /start.")
@@ -120,7 +173,7 @@ class TelegramBot:
         
         elif data.startswith("list_cat_"):
             page = int(data.split("_")[2])
-            categories = self.content_manager.db_handler.get_user_categories(user_id)
+            categories = await self.db_handler.get_user_categories(user_id)
             if not categories:
                 await query.edit_message_text("No tienes categorías.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Volver", callback_data="back_main")]]))
                 return
@@ -143,8 +196,13 @@ class TelegramBot:
             parts = data.split("_")
             category = "_".join(parts[2:-1]).replace("_", " ")
             page = int(parts[-1])
+            categories = await self.db_handler.get_user_categories(user_id)
+            if category not in categories:
+                await query.edit_message_text("Categoría no válida.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Volver", callback_data="list_cat_0")]]))
+                return
             keyboard = [
-                [InlineKeyboardButton("Ver ideas", callback_data=f"list_ideas_{category.replace(' ', '_')}_0")],
+                # El callback lleva el índice de la categoría (como gen_cat_): Telegram limita callback_data a 64 bytes
+                [InlineKeyboardButton("Ver ideas", callback_data=f"list_ideas_{categories.index(category)}_0")],
                 [InlineKeyboardButton("Editar categoría", callback_data=f"edit_cat_{category.replace(' ', '_')}")],
                 [InlineKeyboardButton("Eliminar categoría", callback_data=f"delete_cat_{category.replace(' ', '_')}")]
             ]
@@ -154,31 +212,30 @@ class TelegramBot:
         
         elif data.startswith("list_ideas_"):
             parts = data.split("_")
-            category = "_".join(parts[2:-1]).replace("_", " ")
-            page = int(parts[-1])
-            ideas = self.content_manager.db_handler.get_user_ideas(user_id, category, limit=5, offset=page*5)
-            if not ideas:
+            cat_index = int(parts[2])
+            token = parts[3]
+            categories = await self.db_handler.get_user_categories(user_id)
+            if cat_index >= len(categories):
+                await query.edit_message_text("Categoría no válida.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Volver", callback_data="list_cat_0")]]))
+                return
+            category = categories[cat_index]
+            # El cursor viaja en el callback: "n<cursor>" página siguiente, "p<cursor>" anterior
+            after = decode_cursor(token[1:]) if token.startswith("n") else None
+            before = decode_cursor(token[1:]) if token.startswith("p") else None
+            page = await self.db_handler.get_idea_page(user_id, category, limit=5, after=after, before=before)
+            if not page['ideas']:
                 await query.edit_message_text(f"No hay ideas en '{category}'.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Volver", callback_data=f"view_cat_{category.replace(' ', '_')}_0")]]))
                 return
-            idea_dict = {}
-            for idea in ideas:
-                iid = idea['id']
-                if iid not in idea_dict:
-                    idea_dict[iid] = {'es': {}, 'en': {}, 'created_at': idea['created_at']}
-                idea_dict[iid][idea['language']] = {
-                    'title': idea['title'],
-                    'content': idea['content'],
-                    'hashtags': idea['hashtags']
-                }
             keyboard = []
-            for iid, data in list(idea_dict.items())[:5]: 
-                title = data.get('es', {}).get('title', 'Sin título')
-                date_str = data['created_at'].strftime('%Y-%m-%d')
-                keyboard.append([InlineKeyboardButton(f"{title} - {date_str}", callback_data=f"show_idea_{iid}")])
-            if page > 0:
-                keyboard.append([InlineKeyboardButton("⬅️ Anterior", callback_data=f"list_ideas_{category.replace(' ', '_')}_{page-1}")])
-            if len(idea_dict) == 5:
-                keyboard.append([InlineKeyboardButton("Siguiente ➡️", callback_data=f"list_ideas_{category.replace(' ', '_')}_{page+1}")])
+            for idea in page['ideas']:
+                es = idea['translations'].get('es')
+                title = es.title if es else 'Sin título'
+                date_str = idea['created_at'].strftime('%Y-%m-%d')
+                keyboard.append([InlineKeyboardButton(f"{title} - {date_str}", callback_data=f"show_idea_{idea['id']}")])
+            if page['prev_cursor']:
+                keyboard.append([InlineKeyboardButton("⬅️ Anterior", callback_data=f"list_ideas_{cat_index}_p{encode_cursor(page['prev_cursor'])}")])
+            if page['next_cursor']:
+                keyboard.append([InlineKeyboardButton("Siguiente ➡️", callback_data=f"list_ideas_{cat_index}_n{encode_cursor(page['next_cursor'])}")])
             keyboard.append([InlineKeyboardButton("⬅️ Volver", callback_data=f"view_cat_{category.replace(' ', '_')}_0")])
             reply_markup = InlineKeyboardMarkup(keyboard)
             await query.edit_message_text(f"Ideas en '{category}':", reply_markup=reply_markup)
@@ -199,44 +256,43 @@ class TelegramBot:
         
         elif data.startswith("confirm_delete_"):
             category = "_".join(data.split("_")[2:]).replace("_", " ")
-            self.content_manager.db_handler.delete_user_category(user_id, category)
+            await self.db_handler.delete_user_category(user_id, category)
             await query.edit_message_text(f"Categoría '{category}' eliminada.", reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Volver", callback_data="list_cat_0")]]))
         
         elif data.startswith("show_idea_"):
             iid = int(data.split("_")[2])
-            translations = self.content_manager.db_handler.get_idea_with_translations(iid)
-            if not translations:
+            idea = await self.db_handler.get_idea_with_translations(iid)
+            if not idea:
                 try:
                     await query.edit_message_text("Idea no encontrada.")
                 except Exception:
                     pass
                 return
-            es = translations.get('es')
-            en = translations.get('en')
+            es = idea.es
+            en = idea.en
             try:
                 await query.edit_message_text("Mostrando idea...")
             except Exception:
                 pass
+            batch = self.sender.batch(query.message.chat_id)
             if es:
-                es_content = f"**{es['title']}**\n\n**Gancho:** {es['content']['gancho']}\n**Cuerpo:** {es['content']['cuerpo']}\n**Cierre:** {es['content']['cierre']}"
-                await query.message.reply_text(es_content, parse_mode='Markdown')
-                await query.message.reply_text(f"**Hashtags:** {es['hashtags']}", parse_mode='Markdown')
-                if 'video_prompts' in es and es['video_prompts']:
-                    await query.message.reply_text("**Prompts para videos (Español):**", parse_mode='Markdown')
-                    for prompt in es['video_prompts']:
-                        await query.message.reply_text(prompt)
+                es_content = f"**{escape_markdown(es.title)}**\n\n**Gancho:** {escape_markdown(es.script.hook)}\n**Cuerpo:** {escape_markdown(es.script.body)}\n**Cierre:** {escape_markdown(es.script.closing)}"
+                batch.text(es_content, markdown=True)
+                batch.text(f"**Hashtags:** {escape_markdown(es.hashtags)}", markdown=True)
+                self._queue_prompts(batch, es, "**Prompts para videos (Español):**")
+                self._queue_pexels(batch, es, "**Imágenes sugeridas (Pexels):**", "**Videos sugeridos (Pexels):**")
             if en:
-                en_content = f"**{en['title']}**\n\n**Hook:** {en['content']['gancho']}\n**Body:** {en['content']['cuerpo']}\n**Closing:** {en['content']['cierre']}"
-                await query.message.reply_text(en_content, parse_mode='Markdown')
-                await query.message.reply_text(f"**Hashtags:** {en['hashtags']}", parse_mode='Markdown')
-                if 'video_prompts' in en and en['video_prompts']:
-                    await query.message.reply_text("**Prompts para videos (English):**", parse_mode='Markdown')
-                    for prompt in en['video_prompts']:
-                        await query.message.reply_text(prompt)
+                en_content = f"**{escape_markdown(en.title)}**\n\n**Hook:** {escape_markdown(en.script.hook)}\n**Body:** {escape_markdown(en.script.body)}\n**Closing:** {escape_markdown(en.script.closing)}"
+                batch.text(en_content, markdown=True)
+                batch.text(f"**Hashtags:** {escape_markdown(en.hashtags)}", markdown=True)
+                self._queue_prompts(batch, en, "**Prompts para videos (English):**")
+                if idea.own_media('en'):
+                    self._queue_pexels(batch, en, "**Suggested images (Pexels):**", "**Suggested videos (Pexels):**")
+            await batch.flush()
         
         elif data.startswith("gen_cat_"):
             cat_index = int(data.split("_")[2])
-            categories = self.content_manager.db_handler.get_user_categories(user_id)
+            categories = await self.db_handler.get_user_categories(user_id)
             if cat_index >= len(categories):
                 try:
                     await query.edit_message_text("Categoría no válida.")
@@ -244,51 +300,42 @@ class TelegramBot:
                     pass
                 return
             category = categories[cat_index]
+            chat_id = query.message.chat_id
             await query.message.delete()
-            generating_msg = await context.bot.send_message(chat_id=query.message.chat_id, text="Estoy generando la idea...")
-            try:
-                ideas = self.content_manager.generate_and_save_idea(user_id, category)
-                await context.bot.delete_message(chat_id=query.message.chat_id, message_id=generating_msg.message_id)
-                es = ideas['es']
-                en = ideas['en']
-                es_content = f"**{category} - Español**\n\n**Título:** {es['title']}\n\n**Guion:**\n- Gancho: {es['script']['gancho']}\n- Cuerpo: {es['script']['cuerpo']}\n- Cierre: {es['script']['cierre']}"
-                await context.bot.send_message(chat_id=query.message.chat_id, text=es_content, parse_mode='Markdown')
-                await context.bot.send_message(chat_id=query.message.chat_id, text=f"**Hashtags:** {es['hashtags']}", parse_mode='Markdown')
-                if 'video_prompts' in es and es['video_prompts']:
-                    await context.bot.send_message(chat_id=query.message.chat_id, text="**Prompts para videos (Español):**", parse_mode='Markdown')
-                    for prompt in es['video_prompts']:
-                        await context.bot.send_message(chat_id=query.message.chat_id, text=prompt)
-                # Mostrar links de imágenes y videos de Pexels (Español)
-                if 'pexels_images' in es and es['pexels_images']:
-                    await context.bot.send_message(chat_id=query.message.chat_id, text="**Imágenes sugeridas (Pexels):**", parse_mode='Markdown')
-                    for img_url in es['pexels_images']:
-                        await context.bot.send_message(chat_id=query.message.chat_id, text=img_url)
-                if 'pexels_videos' in es and es['pexels_videos']:
-                    await context.bot.send_message(chat_id=query.message.chat_id, text="**Videos sugeridos (Pexels):**", parse_mode='Markdown')
-                    for vid_url in es['pexels_videos']:
-                        await context.bot.send_message(chat_id=query.message.chat_id, text=vid_url)
-
-                # Usar las claves correctas en inglés
-                en_script = en.get('script', {})
-                en_content = f"**{category} - English**\n\n**Title:** {en['title']}\n\n**Script:**\n- Hook: {en_script.get('hook', '')}\n- Body: {en_script.get('body', '')}\n- Closing: {en_script.get('closing', '')}"
-                await context.bot.send_message(chat_id=query.message.chat_id, text=en_content, parse_mode='Markdown')
-                await context.bot.send_message(chat_id=query.message.chat_id, text=f"**Hashtags:** {en['hashtags']}", parse_mode='Markdown')
-                if 'video_prompts' in en and en['video_prompts']:
-                    await context.bot.send_message(chat_id=query.message.chat_id, text="**Prompts para videos (English):**", parse_mode='Markdown')
-                    for prompt in en['video_prompts']:
-                        await context.bot.send_message(chat_id=query.message.chat_id, text=prompt)
-                # Mostrar links de imágenes y videos de Pexels (Inglés)
-                if 'pexels_images' in en and en['pexels_images']:
-                    await context.bot.send_message(chat_id=query.message.chat_id, text="**Suggested images (Pexels):**", parse_mode='Markdown')
-                    for img_url in en['pexels_images']:
-                        await context.bot.send_message(chat_id=query.message.chat_id, text=img_url)
-                if 'pexels_videos' in en and en['pexels_videos']:
-                    await context.bot.send_message(chat_id=query.message.chat_id, text="**Suggested videos (Pexels):**", parse_mode='Markdown')
-                    for vid_url in en['pexels_videos']:
-                        await context.bot.send_message(chat_id=query.message.chat_id, text=vid_url)
-            except Exception as e:
-                await context.bot.edit_message_text(chat_id=query.message.chat_id, message_id=generating_msg.message_id, text="Error al generar la idea. Inténtalo de nuevo.")
-                logger.error(f"Error generating idea: {e}")
+            generating_msg = await context.bot.send_message(chat_id=chat_id, text="Estoy generando la idea...")
+            
+            # Las vistas previas y la entrega se aplican en orden; después de entregar no se edita más
+            preview = {'lock': asyncio.Lock(), 'delivered': False}
+            
+            async def show_progress(partial):
+                async with preview['lock']:
+                    if preview['delivered']:
+                        return
+                    try:
+                        await self.sender.edit_text(chat_id, generating_msg.message_id, self._preview_text(category, partial))
+                    except Exception as e:
+                        logger.warning(f"Could not update generation preview: {e}")
+            
+            async def show_queue(position, eta):
+                async with preview['lock']:
+                    if preview['delivered']:
+                        return
+                    if position:
+                        text = f"Hay mucha demanda. Estás en la posición {position} de la cola (~{max(1, round(eta))} s)."
+                    else:
+                        text = "Estoy generando la idea..."
+                    try:
+                        await self.sender.edit_text(chat_id, generating_msg.message_id, text)
+                    except Exception as e:
+                        logger.warning(f"Could not update queue position: {e}")
+            
+            async def deliver(ideas, error):
+                async with preview['lock']:
+                    preview['delivered'] = True
+                await self._deliver_idea(context.bot, chat_id, generating_msg.message_id, category, ideas, error)
+            
+            if not self.generation_worker.submit(user_id, category, deliver, show_progress, show_queue):
+                await context.bot.edit_message_text(chat_id=chat_id, message_id=generating_msg.message_id, text="Ya hay una idea en proceso o el bot está ocupado. Inténtalo en unos momentos.")
         
         elif data == "back_main":
             keyboard = [
@@ -298,6 +345,69 @@ class TelegramBot:
             reply_markup = InlineKeyboardMarkup(keyboard)
             await query.edit_message_text("Bienvenido! Elige una opción:", reply_markup=reply_markup)
     
+    async def _deliver_idea(self, bot, chat_id: int, message_id: int, category: str, ideas, error):
+        """Completion callback for a generation job: replaces the placeholder with the idea."""
+        if error is not None:
+            logger.error(f"Error generating idea: {error}")
+            await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text="Error al generar la idea. Inténtalo de nuevo.")
+            return
+        try:
+            await bot.delete_message(chat_id=chat_id, message_id=message_id)
+            es = ideas.es
+            en = ideas.en
+            batch = self.sender.batch(chat_id)
+            es_content = f"**{escape_markdown(category)} - Español**\n\n**Título:** {escape_markdown(es.title)}\n\n**Guion:**\n- Gancho: {escape_markdown(es.script.hook)}\n- Cuerpo: {escape_markdown(es.script.body)}\n- Cierre: {escape_markdown(es.script.closing)}"
+            batch.text(es_content, markdown=True)
+            batch.text(f"**Hashtags:** {escape_markdown(es.hashtags)}", markdown=True)
+            self._queue_prompts(batch, es, "**Prompts para videos (Español):**")
+            self._queue_pexels(batch, es, "**Imágenes sugeridas (Pexels):**", "**Videos sugeridos (Pexels):**")
+
+            en_content = f"**{escape_markdown(category)} - English**\n\n**Title:** {escape_markdown(en.title)}\n\n**Script:**\n- Hook: {escape_markdown(en.script.hook)}\n- Body: {escape_markdown(en.script.body)}\n- Closing: {escape_markdown(en.script.closing)}"
+            batch.text(en_content, markdown=True)
+            batch.text(f"**Hashtags:** {escape_markdown(en.hashtags)}", markdown=True)
+            self._queue_prompts(batch, en, "**Prompts para videos (English):**")
+            if ideas.own_media('en'):
+                self._queue_pexels(batch, en, "**Suggested images (Pexels):**", "**Suggested videos (Pexels):**")
+            await batch.flush()
+        except Exception as e:
+            logger.error(f"Error sending generated idea: {e}")
+    
+    @staticmethod
+    def _preview_text(category: str, partial) -> str:
+        def filled(translation):
+            script = translation.get('script', {})
+            return bool(translation.get('title')) + sum(bool(script.get(key)) for key in ('gancho', 'cuerpo', 'cierre'))
+        # El inglés suele llegar primero; se muestra el español en cuanto va igual de avanzado
+        es, en = partial.get('es', {}), partial.get('en', {})
+        translation = es if filled(es) >= filled(en) else en
+        script = translation.get('script', {})
+        lines = [f"Estoy generando la idea... ({category})", ""]
+        if translation.get('title'):
+            lines += [f"Título: {translation['title']}", ""]
+        for label, key in (("Gancho", 'gancho'), ("Cuerpo", 'cuerpo'), ("Cierre", 'cierre')):
+            if script.get(key):
+                lines.append(f"- {label}: {script[key]}")
+        return "\n".join(lines).strip()
+    
+    @staticmethod
+    def _queue_prompts(batch, translation, header: str):
+        if translation.video_prompts:
+            batch.text(header, markdown=True)
+            shots = translation.shot_videos
+            for i, prompt in enumerate(translation.video_prompts):
+                shot = shots[i] if i < len(shots) else None
+                batch.text(f"{prompt}\n🎬 {shot}" if shot else prompt)
+    
+    @staticmethod
+    def _queue_pexels(batch, translation, images_header: str, videos_header: str):
+        # Las imágenes van como álbum; los videos como links en un solo mensaje
+        if translation.pexels_images:
+            batch.text(images_header, markdown=True)
+            batch.photos(translation.pexels_images)
+        if translation.pexels_videos:
+            batch.text(videos_header, markdown=True)
+            batch.text("\n".join(translation.pexels_videos))
+    
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
         if user_id not in self.user_states:
@@ -308,7 +418,7 @@ class TelegramBot:
             if not category_name:
                 await update.message.reply_text("Nombre inválido. Intenta de nuevo:")
                 return
-            self.content_manager.db_handler.add_user_category(user_id, category_name)
+            await self.db_handler.add_user_category(user_id, category_name)
             await update.message.reply_text(f"Categoría '{category_name}' agregada. Ahora puedes generar ideas en ella.")
             del self.user_states[user_id]
             keyboard = [
@@ -324,11 +434,14 @@ class TelegramBot:
             if not new_cat:
                 await update.message.reply_text("Nombre inválido. Intenta de nuevo:")
                 return
-            self.content_manager.db_handler.update_user_category(user_id, old_cat, new_cat)
+            await self.db_handler.update_user_category(user_id, old_cat, new_cat)
             await update.message.reply_text(f"Categoría cambiada de '{old_cat}' a '{new_cat}'.")
             del self.user_states[user_id]
             reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("Volver a categorías", callback_data="list_cat_0")]])
             await update.message.reply_text("Categoría actualizada.", reply_markup=reply_markup)
     
     def run(self):
-        self.application.run_polling()
\ No newline at end of file
+        try:
+            self.application.run_polling()
+        finally:
+            self.generation_worker.shutdown(wait=False)
\ No newline at end of file
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Dict, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates from different chats concurrently, keeping each chat in order."""
+
+    def __init__(self, max_concurrent_updates: int, max_backlog: int = 1024):
+        # The base semaphore only caps the backlog. The in-flight limit is applied after
+        # the per-chat lock, so updates queued behind a busy chat don't hold handler slots.
+        super().__init__(max_backlog)
+        self.max_in_flight = max_concurrent_updates
+        self._handler_slots = asyncio.Semaphore(max_concurrent_updates)
+        self._chat_locks: Dict[int, list] = {}
+        self._queued = 0
+        self._in_flight = 0
+        self._processed = 0
+        self._max_wait = 0.0
+        self._recent_waits = deque(maxlen=500)
+
+    @staticmethod
+    def _chat_key(update: object) -> Optional[int]:
+        if isinstance(update, Update):
+            if update.effective_chat:
+                return update.effective_chat.id
+            if update.effective_user:
+                return update.effective_user.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._chat_key(update)
+        queued_at = time.monotonic()
+        started = False
+        self._queued += 1
+        entry = None
+        if key is not None:
+            entry = self._chat_locks.setdefault(key, [asyncio.Lock(), 0])
+            entry[1] += 1
+        try:
+            if entry is not None:
+                await entry[0].acquire()
+            try:
+                async with self._handler_slots:
+                    self._record_start(queued_at)
+                    started = True
+                    try:
+                        await coroutine
+                    finally:
+                        self._in_flight -= 1
+            finally:
+                if entry is not None:
+                    entry[0].release()
+        finally:
+            if not started:
+                self._queued -= 1
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._chat_locks.pop(key, None)
+
+    def _record_start(self, queued_at: float):
+        wait = time.monotonic() - queued_at
+        self._queued -= 1
+        self._in_flight += 1
+        self._processed += 1
+        self._max_wait = max(self._max_wait, wait)
+        self._recent_waits.append(wait)
+
+    def metrics(self) -> Dict[str, float]:
+        """Snapshot of queue depth and wait times (seconds) for recent updates."""
+        waits = sorted(self._recent_waits)
+        p50 = waits[len(waits) // 2] if waits else 0.0
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+        return {
+            'queued': self._queued,
+            'in_flight': self._in_flight,
+            'max_in_flight': self.max_in_flight,
+            'active_chats': len(self._chat_locks),
+            'processed': self._processed,
+            'wait_p50': p50,
+            'wait_p95': p95,
+            'wait_max': self._max_wait,
+        }
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
\ No newline at end of file
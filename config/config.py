@@ -43,4 +43,177 @@ class Config:
     
     @staticmethod
     def get_notion_database_id():
-        return os.getenv('NOTION_DATABASE_ID')
\ No newline at end of file
+        return os.getenv('NOTION_DATABASE_ID')
+    
+    @staticmethod
+    def get_generation_workers():
+        return int(os.getenv('GENERATION_WORKERS', '4'))
+    
+    @staticmethod
+    def get_generation_queue_size():
+        return int(os.getenv('GENERATION_QUEUE_SIZE', '16'))
+    
+    @staticmethod
+    def get_max_concurrent_updates():
+        return int(os.getenv('MAX_CONCURRENT_UPDATES', '16'))
+    
+    @staticmethod
+    def get_update_metrics_interval():
+        return int(os.getenv('UPDATE_METRICS_INTERVAL', '300'))
+    
+    @staticmethod
+    def get_send_rate_per_chat():
+        return float(os.getenv('SEND_RATE_PER_CHAT', '1'))
+    
+    @staticmethod
+    def get_send_burst_per_chat():
+        return float(os.getenv('SEND_BURST_PER_CHAT', '3'))
+    
+    @staticmethod
+    def get_send_rate_global():
+        return float(os.getenv('SEND_RATE_GLOBAL', '25'))
+    
+    @staticmethod
+    def get_access_cache_ttl():
+        return float(os.getenv('ACCESS_CACHE_TTL', '300'))
+    
+    @staticmethod
+    def get_access_cache_negative_ttl():
+        return float(os.getenv('ACCESS_CACHE_NEGATIVE_TTL', '60'))
+    
+    @staticmethod
+    def get_db_pool_size():
+        return int(os.getenv('DB_POOL_SIZE', '8'))
+    
+    @staticmethod
+    def get_db_pool_idle_check():
+        return float(os.getenv('DB_POOL_IDLE_CHECK', '30'))
+    
+    @staticmethod
+    def get_db_pool_timeout():
+        return float(os.getenv('DB_POOL_TIMEOUT', '10'))
+    
+    @staticmethod
+    def get_pexels_pool_size():
+        return int(os.getenv('PEXELS_POOL_SIZE', '8'))
+    
+    @staticmethod
+    def get_pexels_connect_timeout():
+        return float(os.getenv('PEXELS_CONNECT_TIMEOUT', '3.05'))
+    
+    @staticmethod
+    def get_pexels_timeout():
+        return float(os.getenv('PEXELS_TIMEOUT', '10'))
+    
+    @staticmethod
+    def get_pexels_cache_path():
+        return os.getenv('PEXELS_CACHE_PATH', 'pexels_cache.sqlite3')
+    
+    @staticmethod
+    def get_pexels_cache_ttl():
+        return float(os.getenv('PEXELS_CACHE_TTL', '86400'))
+    
+    @staticmethod
+    def get_pexels_cache_memory():
+        return int(os.getenv('PEXELS_CACHE_MEMORY', '256'))
+    
+    @staticmethod
+    def get_pexels_cache_max_rows():
+        return int(os.getenv('PEXELS_CACHE_MAX_ROWS', '5000'))
+    
+    @staticmethod
+    def get_pexels_quota_reserve():
+        return int(os.getenv('PEXELS_QUOTA_RESERVE', '50'))
+    
+    @staticmethod
+    def get_pexels_search_language():
+        return os.getenv('PEXELS_SEARCH_LANGUAGE', 'en')
+    
+    @staticmethod
+    def get_shot_search():
+        return os.getenv('SHOT_SEARCH', 'false').lower() in ('1', 'true', 'yes')
+    
+    @staticmethod
+    def get_shot_search_concurrency():
+        return int(os.getenv('SHOT_SEARCH_CONCURRENCY', '4'))
+    
+    @staticmethod
+    def get_shot_search_budget():
+        return float(os.getenv('SHOT_SEARCH_BUDGET', '6'))
+    
+    @staticmethod
+    def get_seen_media_overfetch():
+        return int(os.getenv('SEEN_MEDIA_OVERFETCH', '2'))
+    
+    @staticmethod
+    def get_stream_generation():
+        return os.getenv('STREAM_GENERATION', 'true').lower() in ('1', 'true', 'yes')
+    
+    @staticmethod
+    def get_similar_titles_in_prompt():
+        return int(os.getenv('SIMILAR_TITLES_IN_PROMPT', '10'))
+    
+    @staticmethod
+    def get_similarity_threshold():
+        return float(os.getenv('SIMILARITY_THRESHOLD', '0.8'))
+    
+    @staticmethod
+    def get_similarity_retries():
+        return int(os.getenv('SIMILARITY_RETRIES', '1'))
+    
+    @staticmethod
+    def get_gemini_cache_ttl():
+        return int(os.getenv('GEMINI_CACHE_TTL', '0'))
+    
+    @staticmethod
+    def get_gemini_models():
+        models = os.getenv('GEMINI_MODELS', 'gemini-2.5-flash-lite,gemini-2.5-flash')
+        return [name.strip() for name in models.split(',') if name.strip()]
+    
+    @staticmethod
+    def get_gemini_deadline():
+        return float(os.getenv('GEMINI_DEADLINE', '60'))
+    
+    @staticmethod
+    def get_gemini_hedge():
+        return os.getenv('GEMINI_HEDGE', 'true').lower() in ('1', 'true', 'yes')
+    
+    @staticmethod
+    def get_gemini_hedge_delay():
+        return float(os.getenv('GEMINI_HEDGE_DELAY', '15'))
+    
+    @staticmethod
+    def get_gemini_max_attempts():
+        return int(os.getenv('GEMINI_MAX_ATTEMPTS', '3'))
+    
+    @staticmethod
+    def get_gemini_retry_backoff():
+        return float(os.getenv('GEMINI_RETRY_BACKOFF', '1'))
+    
+    @staticmethod
+    def get_gemini_concurrency():
+        return int(os.getenv('GEMINI_CONCURRENCY', '4'))
+    
+    @staticmethod
+    def get_gemini_min_concurrency():
+        return int(os.getenv('GEMINI_MIN_CONCURRENCY', '1'))
+    
+    @staticmethod
+    def get_gemini_max_concurrency():
+        return int(os.getenv('GEMINI_MAX_CONCURRENCY', '16'))
+    
+    @staticmethod
+    def get_gemini_queue_timeout():
+        return float(os.getenv('GEMINI_QUEUE_TIMEOUT', '300'))
+    
+    @staticmethod
+    def get_video_orientation():
+        return os.getenv('VIDEO_ORIENTATION', 'portrait')
+    
+    @staticmethod
+    def get_video_resolution():
+        return int(os.getenv('VIDEO_RESOLUTION', '720'))
+    
+    @staticmethod
+    def get_video_max_duration():
+        return float(os.getenv('VIDEO_MAX_DURATION', '15'))
\ No newline at end of file
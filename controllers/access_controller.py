@@ -1,10 +1,53 @@
-from database.database import DatabaseHandler
+import time
+from collections import OrderedDict
+from typing import Tuple
+from config.config import Config
+from database.async_database import AsyncDatabaseHandler
 
 class AccessController:
     """Controls user access."""
     
-    def __init__(self, db_handler: DatabaseHandler):
+    def __init__(self, db_handler: AsyncDatabaseHandler, ttl: float = None, negative_ttl: float = None, max_entries: int = 10000):
         self.db_handler = db_handler
+        self.ttl = Config.get_access_cache_ttl() if ttl is None else ttl
+        self.negative_ttl = Config.get_access_cache_negative_ttl() if negative_ttl is None else negative_ttl
+        self.max_entries = max_entries
+        # LRU: unknown users messaging the bot would otherwise grow it without bound
+        self._cache: "OrderedDict[int, Tuple[bool, float]]" = OrderedDict()
     
-    def has_access(self, user_id: int) -> bool:
-        return self.db_handler.check_user_access(user_id)
\ No newline at end of file
+    def _remember(self, user_id: int, allowed: bool, expires: float):
+        self._cache[user_id] = (allowed, expires)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+    
+    async def has_access(self, user_id: int) -> bool:
+        cached = self._cache.get(user_id)
+        now = time.monotonic()
+        if cached and cached[1] > now:
+            self._cache.move_to_end(user_id)
+            return cached[0]
+        allowed = await self.db_handler.check_user_access(user_id)
+        ttl = self.ttl if allowed else self.negative_ttl
+        if ttl > 0:
+            self._remember(user_id, allowed, now + ttl)
+        return allowed
+    
+    def invalidate(self, user_id: int = None):
+        """Drop cached access for a user (or everyone) after users are added or removed."""
+        if user_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(user_id, None)
+    
+    def grant(self, user_id: int):
+        """Record that a user was just added, so the next check needs no query."""
+        if self.ttl > 0:
+            self._remember(user_id, True, time.monotonic() + self.ttl)
+    
+    def revoke(self, user_id: int):
+        """Record that a user was just removed; takes effect immediately."""
+        if self.negative_ttl > 0:
+            self._remember(user_id, False, time.monotonic() + self.negative_ttl)
+        else:
+            self._cache.pop(user_id, None)
\ No newline at end of file
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+import aiomysql
+from config.config import Config
+from database import queries
+from database.cache import CategoryCache
+from database.queries import Cursor
+from models.idea import Idea
+
+logger = logging.getLogger(__name__)
+
+class AsyncDatabaseHandler:
+    """Asyncio counterpart of DatabaseHandler, awaited by the bot handlers.
+
+    Shares the CategoryCache with the blocking handler used by generation
+    workers, so writes on either side keep the cached lists in sync.
+    """
+
+    def __init__(self, category_cache: CategoryCache = None, pool_size: int = None):
+        self.category_cache = category_cache or CategoryCache()
+        self.pool_size = pool_size or Config.get_db_pool_size()
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+        self._autoinc_step = None
+
+    async def _get_pool(self):
+        # The pool is created lazily so it binds to the loop the bot runs on
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await aiomysql.create_pool(
+                        host=Config.get_db_host(),
+                        port=int(Config.get_db_port()),
+                        user=Config.get_db_user(),
+                        password=Config.get_db_password(),
+                        db=Config.get_db_name(),
+                        charset='utf8mb4',
+                        connect_timeout=5,
+                        autocommit=True,
+                        minsize=1,
+                        maxsize=self.pool_size,
+                        pool_recycle=3600
+                    )
+                    logger.info("Async database pool created")
+        return self._pool
+
+    @asynccontextmanager
+    async def _cursor(self, dictionary: bool = False):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor if dictionary else aiomysql.Cursor) as cursor:
+                yield conn, cursor
+
+    @asynccontextmanager
+    async def _transaction(self, dictionary: bool = False):
+        async with self._cursor(dictionary) as (conn, cursor):
+            await conn.begin()
+            try:
+                yield cursor
+                await conn.commit()
+            except BaseException:
+                await conn.rollback()
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        if self._pool is None:
+            return {'size': 0, 'free': 0, 'max': self.pool_size}
+        return {'size': self._pool.size, 'free': self._pool.freesize, 'max': self._pool.maxsize}
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+    async def check_user_access(self, user_id: int) -> bool:
+        async with self._cursor() as (conn, cursor):
+            await cursor.execute(queries.CHECK_USER_ACCESS, (user_id,))
+            return await cursor.fetchone() is not None
+
+    async def insert_idea(self, user_id: int, category: str, ideas: Idea) -> int:
+        return (await self.insert_ideas(user_id, category, [ideas]))[0]
+
+    async def insert_ideas(self, user_id: int, category: str, ideas_list: List[Idea]) -> List[int]:
+        if not ideas_list:
+            return []
+        step = await self._auto_increment_step()
+        async with self._transaction() as cursor:
+            await cursor.execute(queries.ENSURE_CATEGORY, (user_id, category))
+            await cursor.execute(*queries.insert_ideas_query(user_id, cursor.lastrowid, len(ideas_list)))
+            ids = queries.idea_ids(cursor.lastrowid, len(ideas_list), step)
+            await cursor.execute(*queries.insert_translations_query(ideas_list, ids))
+            media = queries.insert_media_query(ideas_list, ids)
+            if media:
+                await cursor.execute(*media)
+        self.category_cache.add(user_id, category)
+        return ids
+
+    async def _auto_increment_step(self) -> int:
+        if self._autoinc_step is None:
+            async with self._cursor() as (conn, cursor):
+                await cursor.execute(queries.AUTO_INCREMENT_STEP)
+                self._autoinc_step = int((await cursor.fetchone())[0])
+        return self._autoinc_step
+
+    async def get_user_categories(self, user_id: int) -> List[str]:
+        cached = self.category_cache.get(user_id)
+        if cached is not None:
+            return cached
+        async with self._cursor() as (conn, cursor):
+            await cursor.execute(queries.SELECT_CATEGORIES, (user_id,))
+            result = [row[0] for row in await cursor.fetchall()]
+        self.category_cache.set(user_id, result)
+        return self.category_cache.get(user_id)
+
+    async def add_user_category(self, user_id: int, category: str):
+        async with self._cursor() as (conn, cursor):
+            await cursor.execute(queries.ADD_CATEGORY, (user_id, category))
+        self.category_cache.add(user_id, category)
+
+    async def get_user_ideas(self, user_id: int, category: str = None, limit: int = 10, offset: int = 0) -> List[Dict]:
+        async with self._cursor(dictionary=True) as (conn, cursor):
+            if category:
+                await cursor.execute(queries.SELECT_IDEAS_BY_CATEGORY, (user_id, category, limit, offset))
+            else:
+                await cursor.execute(queries.SELECT_IDEAS, (user_id, limit, offset))
+            return list(await cursor.fetchall())
+
+    async def get_idea_page(self, user_id: int, category: str, limit: int = 5, after: Optional[Cursor] = None, before: Optional[Cursor] = None) -> Dict[str, Any]:
+        async with self._cursor(dictionary=True) as (conn, cursor):
+            await cursor.execute(*queries.idea_page_query(user_id, category, limit, after, before))
+            ideas, has_more = queries.page_ideas(list(await cursor.fetchall()), limit, before)
+            if ideas:
+                by_id = {idea['id']: idea for idea in ideas}
+                await cursor.execute(*queries.translations_in_query(list(by_id)))
+                for row in await cursor.fetchall():
+                    by_id[row['idea_id']]['translations'][row['language']] = queries.translation_from_row(row)
+        return queries.page_result(ideas, has_more, after, before)
+
+    async def update_user_category(self, user_id: int, old_cat: str, new_cat: str):
+        async with self._transaction() as cursor:
+            await cursor.execute(queries.SELECT_CATEGORY_ID, (user_id, old_cat))
+            old_row = await cursor.fetchone()
+            await cursor.execute(queries.SELECT_CATEGORY_ID, (user_id, new_cat))
+            new_row = await cursor.fetchone()
+            if old_row and (new_row is None or new_row[0] == old_row[0]):
+                await cursor.execute(queries.RENAME_CATEGORY, (new_cat, old_row[0]))
+            elif old_row:
+                await cursor.execute(queries.MOVE_CATEGORY_IDEAS, (new_row[0], old_row[0]))
+                await cursor.execute(queries.DELETE_CATEGORY_BY_ID, (old_row[0],))
+        self.category_cache.rename(user_id, old_cat, new_cat)
+
+    async def delete_user_category(self, user_id: int, category: str):
+        async with self._cursor() as (conn, cursor):
+            await cursor.execute(queries.DELETE_CATEGORY, (user_id, category))
+        self.category_cache.remove(user_id, category)
+
+    async def get_telegram_file_ids(self, keys: List[str]) -> Dict[str, str]:
+        if not keys:
+            return {}
+        async with self._cursor() as (conn, cursor):
+            await cursor.execute(*queries.telegram_file_ids_query(keys))
+            return {key: file_id for key, file_id in await cursor.fetchall()}
+
+    async def save_telegram_file_ids(self, file_ids: Dict[str, str]):
+        if file_ids:
+            async with self._cursor() as (conn, cursor):
+                await cursor.execute(*queries.save_telegram_file_ids_query(file_ids))
+
+    async def delete_telegram_file_ids(self, keys: List[str]):
+        if keys:
+            async with self._cursor() as (conn, cursor):
+                await cursor.execute(*queries.delete_telegram_file_ids_query(keys))
+
+    async def get_idea_with_translations(self, idea_id: int) -> Idea:
+        async with self._cursor(dictionary=True) as (conn, cursor):
+            await cursor.execute(queries.SELECT_IDEA_TRANSLATIONS, (idea_id,))
+            results = await cursor.fetchall()
+        return queries.translations_with_media(results)
\ No newline at end of file
@@ -0,0 +1,66 @@
+import threading
+from typing import Callable, Dict, List, Optional
+
+def _sort_key(name: str) -> str:
+    return name.casefold()
+
+class CategoryCache:
+    """Per-user category lists kept in sync by DatabaseHandler writes (write-through).
+
+    Other per-category caches can subscribe() to be told, as
+    listener(user_id, category), when a category is renamed, merged or deleted.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._categories: Dict[int, List[str]] = {}
+        self._listeners: List[Callable[[int, str], None]] = []
+
+    def subscribe(self, listener: Callable[[int, str], None]):
+        self._listeners.append(listener)
+
+    def _changed(self, user_id: int, *categories: str):
+        for listener in self._listeners:
+            for category in categories:
+                listener(user_id, category)
+
+    def get(self, user_id: int) -> Optional[List[str]]:
+        with self._lock:
+            cached = self._categories.get(user_id)
+            return list(cached) if cached is not None else None
+
+    def set(self, user_id: int, categories: List[str]):
+        with self._lock:
+            self._categories[user_id] = sorted(categories, key=_sort_key)
+
+    def add(self, user_id: int, category: str):
+        with self._lock:
+            cached = self._categories.get(user_id)
+            if cached is not None and category not in cached:
+                cached.append(category)
+                cached.sort(key=_sort_key)
+
+    def rename(self, user_id: int, old: str, new: str):
+        with self._lock:
+            cached = self._categories.get(user_id)
+            if cached is not None and old in cached:
+                cached.remove(old)
+                if new not in cached:
+                    cached.append(new)
+                    cached.sort(key=_sort_key)
+        # Renaming onto an existing category merges both
+        self._changed(user_id, old, new)
+
+    def remove(self, user_id: int, category: str):
+        with self._lock:
+            cached = self._categories.get(user_id)
+            if cached is not None and category in cached:
+                cached.remove(category)
+        self._changed(user_id, category)
+
+    def invalidate(self, user_id: int = None):
+        with self._lock:
+            if user_id is None:
+                self._categories.clear()
+            else:
+                self._categories.pop(user_id, None)
\ No newline at end of file
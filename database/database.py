@@ -1,30 +1,61 @@
-import json
+import calendar
 import logging
-import mysql.connector
 from mysql.connector import Error
-from typing import Dict, Any, List
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
 from config.config import Config
+from database import queries
+from database.cache import CategoryCache
+from database.pool import ConnectionPool
+from database.queries import Cursor
+from models.idea import Idea
 
 logger = logging.getLogger(__name__)
 
+def encode_cursor(cursor: Cursor) -> str:
+    """Compact, callback-safe form of a (created_at, id) keyset cursor."""
+    created_at, idea_id = cursor
+    return f"{_to_base36(calendar.timegm(created_at.timetuple()))}.{_to_base36(idea_id)}"
+
+def decode_cursor(token: str) -> Cursor:
+    ts, idea_id = token.split(".")
+    return datetime.fromtimestamp(int(ts, 36), timezone.utc).replace(tzinfo=None), int(idea_id, 36)
+
+def _to_base36(value: int) -> str:
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    out = ""
+    while True:
+        value, rem = divmod(value, 36)
+        out = digits[rem] + out
+        if value == 0:
+            return out
+
 class DatabaseHandler:
     """Handles database connections and operations."""
     
-    def __init__(self):
-        self.connection = None
+    def __init__(self, category_cache: CategoryCache = None, pool_size: int = None):
+        self.category_cache = category_cache or CategoryCache()
+        self._autoinc_step = None
+        self.pool = ConnectionPool(
+            size=pool_size or Config.get_db_pool_size(),
+            idle_check_seconds=Config.get_db_pool_idle_check(),
+            acquire_timeout=Config.get_db_pool_timeout(),
+            host=Config.get_db_host(),
+            port=int(Config.get_db_port()),
+            user=Config.get_db_user(),
+            password=Config.get_db_password(),
+            database=Config.get_db_name(),
+            connection_timeout=5,
+            autocommit=True,
+            use_pure=True
+        )
         self.connect()
     
     def connect(self):
+        """Open the first pooled connection so bad settings fail at startup."""
         try:
-            self.connection = mysql.connector.connect(
-                host=Config.get_db_host(),
-                port=int(Config.get_db_port()),
-                user=Config.get_db_user(),
-                password=Config.get_db_password(),
-                database=Config.get_db_name(),
-                connection_timeout=5,
-                use_pure=True
-            )
+            with self.pool.connection():
+                pass
             logger.info("Database connected successfully")
         except Error as e:
             logger.error(f"Error connecting to database: {e}")
@@ -32,125 +63,164 @@ class DatabaseHandler:
     
     def check_user_access(self, user_id: int) -> bool:
         """Check if user has access."""
-        if not self.connection.is_connected():
-            self.connect()
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT id FROM users WHERE id = %s", (user_id,))
-        result = cursor.fetchone()
-        cursor.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(queries.CHECK_USER_ACCESS, (user_id,))
+            result = cursor.fetchone()
+            cursor.close()
         return result is not None
     
-    def insert_idea(self, user_id: int, category: str, ideas: Dict[str, Any]) -> int:
+    def insert_idea(self, user_id: int, category: str, ideas: Idea) -> int:
         """Insert new idea and translations, return idea_id."""
-        if not self.connection.is_connected():
-            self.connect()
-        cursor = self.connection.cursor()
-        cursor.execute("INSERT INTO content_ideas (user_id, category) VALUES (%s, %s)", (user_id, category))
-        idea_id = cursor.lastrowid
-        
-        for lang, data in ideas.items():
-            content_json = json.dumps(data['script'])
-            video_prompts_json = json.dumps(data.get('video_prompts', []))
-            try:
-                cursor.execute(
-                    "INSERT INTO content_translations (idea_id, language, title, content, hashtags, video_prompts) VALUES (%s, %s, %s, %s, %s, %s)",
-                    (idea_id, lang, data['title'], content_json, data['hashtags'], video_prompts_json)
-                )
-            except Exception as e:
-                logger.error(f"Error inserting translation for lang {lang}: {e}")
-                # Fallback without video_prompts
-                cursor.execute(
-                    "INSERT INTO content_translations (idea_id, language, title, content, hashtags) VALUES (%s, %s, %s, %s, %s)",
-                    (idea_id, lang, data['title'], content_json, data['hashtags'])
-                )
-        
-        self.connection.commit()
-        cursor.close()
-        return idea_id
+        return self.insert_ideas(user_id, category, [ideas])[0]
+    
+    def insert_ideas(self, user_id: int, category: str, ideas_list: List[Idea]) -> List[int]:
+        """Insert several ideas and all their translations in one transaction.
+
+        Uses one multi-row INSERT per table, so a batch costs the same number
+        of round-trips as a single idea. Returns the new idea ids in order.
+        """
+        if not ideas_list:
+            return []
+        with self.pool.connection() as conn:
+            step = self._auto_increment_step(conn)
+            conn.start_transaction()
+            cursor = conn.cursor()
+            cursor.execute(queries.ENSURE_CATEGORY, (user_id, category))
+            cursor.execute(*queries.insert_ideas_query(user_id, cursor.lastrowid, len(ideas_list)))
+            ids = queries.idea_ids(cursor.lastrowid, len(ideas_list), step)
+            cursor.execute(*queries.insert_translations_query(ideas_list, ids))
+            media = queries.insert_media_query(ideas_list, ids)
+            if media:
+                cursor.execute(*media)
+            conn.commit()
+            cursor.close()
+        self.category_cache.add(user_id, category)
+        return ids
+    
+    def _auto_increment_step(self, conn) -> int:
+        if self._autoinc_step is None:
+            cursor = conn.cursor()
+            cursor.execute(queries.AUTO_INCREMENT_STEP)
+            self._autoinc_step = int(cursor.fetchone()[0])
+            cursor.close()
+        return self._autoinc_step
     
     def get_user_categories(self, user_id: int) -> List[str]:
-        """Get user's categories."""
-        if not self.connection.is_connected():
-            self.connect()
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT DISTINCT category FROM content_ideas WHERE user_id = %s ORDER BY category", (user_id,))
-        result = [row[0] for row in cursor.fetchall()]
-        cursor.close()
-        return result
+        """Get user's categories (served from the category cache after the first load)."""
+        cached = self.category_cache.get(user_id)
+        if cached is not None:
+            return cached
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(queries.SELECT_CATEGORIES, (user_id,))
+            result = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+        self.category_cache.set(user_id, result)
+        return self.category_cache.get(user_id)
     
     def add_user_category(self, user_id: int, category: str):
-        """Add a category for user (by inserting a dummy idea or just ensure exists)."""
-        if not self.connection.is_connected():
-            self.connect()
-        cursor = self.connection.cursor()
-        cursor.execute("INSERT INTO content_ideas (user_id, category) VALUES (%s, %s)", (user_id, category))
-        self.connection.commit()
-        cursor.close()
+        """Add a category for user (no-op if it already exists)."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(queries.ADD_CATEGORY, (user_id, category))
+            conn.commit()
+            cursor.close()
+        self.category_cache.add(user_id, category)
     
     def get_user_ideas(self, user_id: int, category: str = None, limit: int = 10, offset: int = 0) -> List[Dict]:
         """Get user's ideas, optionally by category."""
-        if not self.connection.is_connected():
-            self.connect()
-        cursor = self.connection.cursor(dictionary=True)
-        if category:
-            cursor.execute("""
-                SELECT i.id, i.category, i.created_at, t.language, t.title, t.content, t.hashtags, t.video_prompts
-                FROM content_ideas i
-                JOIN content_translations t ON i.id = t.idea_id
-                WHERE i.user_id = %s AND i.category = %s
-                ORDER BY i.created_at DESC
-                LIMIT %s OFFSET %s
-            """, (user_id, category, limit, offset))
-        else:
-            cursor.execute("""
-                SELECT i.id, i.category, i.created_at, t.language, t.title, t.content, t.hashtags, t.video_prompts
-                FROM content_ideas i
-                JOIN content_translations t ON i.id = t.idea_id
-                WHERE i.user_id = %s
-                ORDER BY i.created_at DESC
-                LIMIT %s OFFSET %s
-            """, (user_id, limit, offset))
-        result = cursor.fetchall()
-        cursor.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            if category:
+                cursor.execute(queries.SELECT_IDEAS_BY_CATEGORY, (user_id, category, limit, offset))
+            else:
+                cursor.execute(queries.SELECT_IDEAS, (user_id, limit, offset))
+            result = cursor.fetchall()
+            cursor.close()
         return result
     
+    def get_idea_texts(self, user_id: int, category: str) -> List[Tuple[str, str]]:
+        """(title, script text) of every Spanish idea in a category, oldest first."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(queries.SELECT_IDEA_TEXTS, (user_id, category))
+            rows = cursor.fetchall()
+            cursor.close()
+        return [(title, queries.script_text(content)) for title, content in rows]
+    
+    def get_idea_page(self, user_id: int, category: str, limit: int = 5, after: Optional[Cursor] = None, before: Optional[Cursor] = None) -> Dict[str, Any]:
+        """Page a category's ideas newest-first by (created_at, id) keyset.
+
+        Pass `after` (next page) or `before` (previous page) with a cursor from
+        a previous result. Returns the ideas with their translations plus the
+        cursors for the neighbouring pages (None when there is no such page).
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(*queries.idea_page_query(user_id, category, limit, after, before))
+            ideas, has_more = queries.page_ideas(cursor.fetchall(), limit, before)
+            if ideas:
+                by_id = {idea['id']: idea for idea in ideas}
+                cursor.execute(*queries.translations_in_query(list(by_id)))
+                for row in cursor.fetchall():
+                    by_id[row['idea_id']]['translations'][row['language']] = queries.translation_from_row(row)
+            cursor.close()
+        return queries.page_result(ideas, has_more, after, before)
+    
     def update_user_category(self, user_id: int, old_cat: str, new_cat: str):
-        """Update category name for user."""
-        if not self.connection.is_connected():
-            self.connect()
-        cursor = self.connection.cursor()
-        cursor.execute("UPDATE content_ideas SET category = %s WHERE user_id = %s AND category = %s", (new_cat, user_id, old_cat))
-        self.connection.commit()
-        cursor.close()
+        """Update category name for user; renaming onto an existing category merges them."""
+        with self.pool.connection() as conn:
+            conn.start_transaction()
+            cursor = conn.cursor()
+            try:
+                cursor.execute(queries.SELECT_CATEGORY_ID, (user_id, old_cat))
+                old_row = cursor.fetchone()
+                cursor.execute(queries.SELECT_CATEGORY_ID, (user_id, new_cat))
+                new_row = cursor.fetchone()
+                if old_row and (new_row is None or new_row[0] == old_row[0]):
+                    cursor.execute(queries.RENAME_CATEGORY, (new_cat, old_row[0]))
+                elif old_row:
+                    cursor.execute(queries.MOVE_CATEGORY_IDEAS, (new_row[0], old_row[0]))
+                    cursor.execute(queries.DELETE_CATEGORY_BY_ID, (old_row[0],))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        self.category_cache.rename(user_id, old_cat, new_cat)
     
     def delete_user_category(self, user_id: int, category: str):
-        """Delete all ideas in a category for user."""
-        if not self.connection.is_connected():
-            self.connect()
-        cursor = self.connection.cursor()
-        cursor.execute("DELETE FROM content_ideas WHERE user_id = %s AND category = %s", (user_id, category))
-        self.connection.commit()
-        cursor.close()
-    
-    def get_idea_with_translations(self, idea_id: int) -> Dict[str, Dict]:
-        """Get translations for a specific idea."""
-        if not self.connection.is_connected():
-            self.connect()
-        cursor = self.connection.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT language, title, content, hashtags, video_prompts
-            FROM content_translations
-            WHERE idea_id = %s
-        """, (idea_id,))
-        results = cursor.fetchall()
-        cursor.close()
-        translations = {}
-        for row in results:
-            lang = row['language']
-            translations[lang] = {
-                'title': row['title'],
-                'content': json.loads(row['content']),
-                'hashtags': row['hashtags'],
-                'video_prompts': json.loads(row['video_prompts']) if row['video_prompts'] else []
-            }
-        return translations
\ No newline at end of file
+        """Delete a category for user; its ideas go with it (ON DELETE CASCADE)."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(queries.DELETE_CATEGORY, (user_id, category))
+            conn.commit()
+            cursor.close()
+        self.category_cache.remove(user_id, category)
+    
+    def get_seen_media(self, user_id: int) -> Optional[bytes]:
+        """Get the user's Bloom filter of Pexels media already suggested."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(queries.SELECT_SEEN_MEDIA, (user_id,))
+            row = cursor.fetchone()
+            cursor.close()
+        return bytes(row[0]) if row else None
+    
+    def save_seen_media(self, user_id: int, bloom: bytes):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(queries.SAVE_SEEN_MEDIA, (user_id, bloom))
+            conn.commit()
+            cursor.close()
+    
+    def get_idea_with_translations(self, idea_id: int) -> Idea:
+        """Get translations for a specific idea, with its saved Pexels media (one query)."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(queries.SELECT_IDEA_TRANSLATIONS, (idea_id,))
+            results = cursor.fetchall()
+            cursor.close()
+        return queries.translations_with_media(results)
\ No newline at end of file
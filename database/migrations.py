@@ -0,0 +1,145 @@
+import logging
+from database.database import DatabaseHandler
+
+logger = logging.getLogger(__name__)
+
+def _table_exists(cursor, table: str) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,)
+    )
+    return cursor.fetchone() is not None
+
+def _column_exists(cursor, table: str, column: str) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM information_schema.columns WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (table, column)
+    )
+    return cursor.fetchone() is not None
+
+def migrate_categories(cursor) -> bool:
+    """Move categories out of content_ideas into their own table, referenced by id."""
+    if not _column_exists(cursor, 'content_ideas', 'category'):
+        return False
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+          id INT(11) NOT NULL AUTO_INCREMENT,
+          user_id BIGINT(20) NOT NULL,
+          name VARCHAR(100) NOT NULL,
+          created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+          PRIMARY KEY (id),
+          UNIQUE KEY uq_categories_user_name (user_id, name),
+          CONSTRAINT fk_categories_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB
+    """)
+    cursor.execute("""
+        INSERT IGNORE INTO categories (user_id, name)
+        SELECT user_id, category FROM content_ideas GROUP BY user_id, category
+    """)
+    if not _column_exists(cursor, 'content_ideas', 'category_id'):
+        cursor.execute("ALTER TABLE content_ideas ADD COLUMN category_id INT(11) NULL AFTER user_id")
+    cursor.execute("""
+        UPDATE content_ideas i
+        JOIN categories c ON c.user_id = i.user_id AND c.name = i.category
+        SET i.category_id = c.id
+    """)
+    # Las ideas vacías que se usaban para "crear" categorías ya no hacen falta
+    cursor.execute("""
+        DELETE i FROM content_ideas i
+        LEFT JOIN content_translations t ON t.idea_id = i.id
+        WHERE t.id IS NULL
+    """)
+    cursor.execute("""
+        ALTER TABLE content_ideas
+          MODIFY category_id INT(11) NOT NULL,
+          ADD KEY idx_content_ideas_category (category_id, created_at),
+          ADD CONSTRAINT fk_content_ideas_category FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE CASCADE,
+          DROP COLUMN category
+    """)
+    return True
+
+def migrate_idea_media(cursor) -> bool:
+    """Store the Pexels media found for each idea so viewing it needs no new search."""
+    if _table_exists(cursor, 'idea_media'):
+        return False
+    cursor.execute("""
+        CREATE TABLE idea_media (
+          id INT(11) NOT NULL AUTO_INCREMENT,
+          idea_id INT(11) NOT NULL,
+          language ENUM('es','en') NOT NULL,
+          kind ENUM('image','video') NOT NULL,
+          position SMALLINT NOT NULL DEFAULT 0,
+          url VARCHAR(1024) NOT NULL,
+          PRIMARY KEY (id),
+          KEY idx_idea_media_idea (idea_id, language),
+          CONSTRAINT fk_idea_media_idea FOREIGN KEY (idea_id) REFERENCES content_ideas(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB
+    """)
+    return True
+
+def migrate_idea_media_shots(cursor) -> bool:
+    """Allow per-shot b-roll clips (kind 'shot', position = video prompt index) in idea_media."""
+    cursor.execute(
+        "SELECT column_type FROM information_schema.columns WHERE table_schema = DATABASE() AND table_name = 'idea_media' AND column_name = 'kind'"
+    )
+    row = cursor.fetchone()
+    if row is None or 'shot' in row[0]:
+        return False
+    cursor.execute("ALTER TABLE idea_media MODIFY kind ENUM('image','video','shot') NOT NULL")
+    return True
+
+def migrate_telegram_files(cursor) -> bool:
+    """Remember the Telegram file_id of every media file the bot has uploaded."""
+    if _table_exists(cursor, 'telegram_files'):
+        return False
+    cursor.execute("""
+        CREATE TABLE telegram_files (
+          media_key VARCHAR(191) NOT NULL,
+          file_id VARCHAR(255) NOT NULL,
+          created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+          PRIMARY KEY (media_key)
+        ) ENGINE=InnoDB
+    """)
+    return True
+
+def migrate_user_seen_media(cursor) -> bool:
+    """Per-user Bloom filter of the Pexels media already suggested."""
+    if _table_exists(cursor, 'user_seen_media'):
+        return False
+    cursor.execute("""
+        CREATE TABLE user_seen_media (
+          user_id BIGINT(20) NOT NULL,
+          bloom BLOB NOT NULL,
+          updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+          PRIMARY KEY (user_id),
+          CONSTRAINT fk_user_seen_media_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        ) ENGINE=InnoDB
+    """)
+    return True
+
+MIGRATIONS = [
+    migrate_categories,
+    migrate_idea_media,
+    migrate_idea_media_shots,
+    migrate_telegram_files,
+    migrate_user_seen_media,
+]
+
+def run_migrations(connection):
+    """Apply every pending migration. Each one checks the schema first, so re-running is safe."""
+    cursor = connection.cursor(buffered=True)
+    try:
+        for migration in MIGRATIONS:
+            if migration(cursor):
+                connection.commit()
+                logger.info(f"Applied migration {migration.__name__}")
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    with DatabaseHandler(pool_size=1).pool.connection() as conn:
+        run_migrations(conn)
\ No newline at end of file
@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import InterfaceError, OperationalError, PoolError
+
+logger = logging.getLogger(__name__)
+
+class ConnectionPool:
+    """Bounded MySQL connection pool; connections are validated only after sitting idle."""
+
+    def __init__(self, size: int, idle_check_seconds: float, acquire_timeout: float = 10, **connect_kwargs):
+        self.size = size
+        self.idle_check_seconds = idle_check_seconds
+        self.acquire_timeout = acquire_timeout
+        self.connect_kwargs = connect_kwargs
+        # LIFO keeps the most recently used connections hot and lets the rest go idle
+        self._idle: List[Tuple[Any, float]] = []
+        self._lock = threading.Lock()
+        # Waiters wake on both a returned connection and a freed slot
+        self._available = threading.Condition(self._lock)
+        self._created = 0
+        self._acquisitions = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._validations = 0
+        self._replaced = 0
+
+    def _open(self):
+        return mysql.connector.connect(**self.connect_kwargs)
+
+    def _free_slot(self):
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.acquire_timeout
+        conn = None
+        waited = False
+        with self._available:
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(f"No database connection available after {self.acquire_timeout}s")
+                waited = True
+                self._available.wait(remaining)
+        waited = time.monotonic() - start if waited else 0.0
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                self._free_slot()
+                raise
+            self._record(waited)
+            return conn
+        if time.monotonic() - last_used > self.idle_check_seconds:
+            conn = self._validate(conn)
+        self._record(waited)
+        return conn
+
+    def _validate(self, conn):
+        with self._lock:
+            self._validations += 1
+        try:
+            conn.ping(reconnect=False)
+            return conn
+        except Error:
+            logger.warning("Idle database connection was dropped, opening a new one")
+            with self._lock:
+                self._replaced += 1
+            try:
+                conn.close()
+            except Error:
+                pass
+            try:
+                return self._open()
+            except Exception:
+                self._free_slot()
+                raise
+
+    def _record(self, waited: float):
+        with self._lock:
+            self._acquisitions += 1
+            if waited > 0:
+                self._waits += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+    def release(self, conn, discard: bool = False):
+        if not discard:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except Error:
+                discard = True
+        if discard:
+            try:
+                conn.close()
+            except Error:
+                pass
+            self._free_slot()
+            return
+        with self._available:
+            self._idle.append((conn, time.monotonic()))
+            self._available.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out for one operation and return it to the pool afterwards."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except (InterfaceError, OperationalError):
+            # The connection itself is suspect; don't hand it to the next caller
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': self.size,
+                'open': self._created,
+                'idle': len(self._idle),
+                'acquisitions': self._acquisitions,
+                'waits': self._waits,
+                'wait_avg': self._wait_total / self._waits if self._waits else 0.0,
+                'wait_max': self._wait_max,
+                'validations': self._validations,
+                'replaced': self._replaced,
+            }
\ No newline at end of file
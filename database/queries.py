@@ -0,0 +1,215 @@
+"""SQL and row mapping shared by DatabaseHandler and AsyncDatabaseHandler (both use %s params)."""
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from models.idea import Idea, Script, Translation
+
+Cursor = Tuple[datetime, int]
+
+CHECK_USER_ACCESS = "SELECT id FROM users WHERE id = %s"
+
+ENSURE_CATEGORY = "INSERT INTO categories (user_id, name) VALUES (%s, %s) ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)"
+ADD_CATEGORY = "INSERT IGNORE INTO categories (user_id, name) VALUES (%s, %s)"
+SELECT_CATEGORIES = "SELECT name FROM categories WHERE user_id = %s ORDER BY name"
+SELECT_CATEGORY_ID = "SELECT id FROM categories WHERE user_id = %s AND name = %s"
+RENAME_CATEGORY = "UPDATE categories SET name = %s WHERE id = %s"
+MOVE_CATEGORY_IDEAS = "UPDATE content_ideas SET category_id = %s WHERE category_id = %s"
+DELETE_CATEGORY_BY_ID = "DELETE FROM categories WHERE id = %s"
+DELETE_CATEGORY = "DELETE FROM categories WHERE user_id = %s AND name = %s"
+
+AUTO_INCREMENT_STEP = "SELECT @@auto_increment_increment"
+
+SELECT_IDEAS_BY_CATEGORY = """
+    SELECT i.id, c.name AS category, i.created_at, t.language, t.title, t.content, t.hashtags, t.video_prompts
+    FROM categories c
+    JOIN content_ideas i ON i.category_id = c.id
+    JOIN content_translations t ON i.id = t.idea_id
+    WHERE c.user_id = %s AND c.name = %s
+    ORDER BY i.created_at DESC
+    LIMIT %s OFFSET %s
+"""
+SELECT_IDEAS = """
+    SELECT i.id, c.name AS category, i.created_at, t.language, t.title, t.content, t.hashtags, t.video_prompts
+    FROM content_ideas i
+    JOIN categories c ON c.id = i.category_id
+    JOIN content_translations t ON i.id = t.idea_id
+    WHERE i.user_id = %s
+    ORDER BY i.created_at DESC
+    LIMIT %s OFFSET %s
+"""
+SELECT_IDEA_TEXTS = """
+    SELECT t.title, t.content
+    FROM categories c
+    JOIN content_ideas i ON i.category_id = c.id
+    JOIN content_translations t ON t.idea_id = i.id AND t.language = 'es'
+    WHERE c.user_id = %s AND c.name = %s
+    ORDER BY i.id
+"""
+SELECT_IDEA_TRANSLATIONS = """
+    SELECT t.language, t.title, t.content, t.hashtags, t.video_prompts, m.kind AS media_kind, m.position AS media_position, m.url AS media_url
+    FROM content_translations t
+    LEFT JOIN idea_media m ON m.idea_id = t.idea_id AND m.language = t.language
+    WHERE t.idea_id = %s
+    ORDER BY t.language, m.kind, m.position
+"""
+
+MEDIA_FIELDS = {'image': 'pexels_images', 'video': 'pexels_videos'}
+# Per-shot clips are stored with kind 'shot' and position = index of their video prompt
+
+def telegram_file_ids_query(keys: List[str]) -> Tuple[str, list]:
+    placeholders = ", ".join(["%s"] * len(keys))
+    return f"SELECT media_key, file_id FROM telegram_files WHERE media_key IN ({placeholders})", list(keys)
+
+def save_telegram_file_ids_query(file_ids: Dict[str, str]) -> Tuple[str, list]:
+    params = [value for item in file_ids.items() for value in item]
+    sql = (
+        "INSERT INTO telegram_files (media_key, file_id) VALUES "
+        + ", ".join(["(%s, %s)"] * len(file_ids))
+        + " ON DUPLICATE KEY UPDATE file_id = VALUES(file_id)"
+    )
+    return sql, params
+
+def delete_telegram_file_ids_query(keys: List[str]) -> Tuple[str, list]:
+    placeholders = ", ".join(["%s"] * len(keys))
+    return f"DELETE FROM telegram_files WHERE media_key IN ({placeholders})", list(keys)
+
+SELECT_SEEN_MEDIA = "SELECT bloom FROM user_seen_media WHERE user_id = %s"
+SAVE_SEEN_MEDIA = "INSERT INTO user_seen_media (user_id, bloom) VALUES (%s, %s) ON DUPLICATE KEY UPDATE bloom = VALUES(bloom)"
+
+def translation_params(idea_id: int, lang: str, translation: Translation) -> tuple:
+    return (idea_id, lang, translation.title, json.dumps(translation.script.to_dict()), translation.hashtags, json.dumps(translation.video_prompts))
+
+def insert_ideas_query(user_id: int, category_id: int, count: int) -> Tuple[str, list]:
+    """One multi-row INSERT for `count` ideas of the same category."""
+    sql = "INSERT INTO content_ideas (user_id, category_id) VALUES " + ", ".join(["(%s, %s)"] * count)
+    return sql, [user_id, category_id] * count
+
+def idea_ids(first_id: int, count: int, step: int) -> List[int]:
+    # InnoDB reserves the auto-increment values of a "simple insert" (known row count) in
+    # one block, and content_ideas only ever receives simple inserts, so the ids of a
+    # multi-row INSERT are consecutive (in auto_increment_increment steps) from lastrowid
+    return [first_id + i * step for i in range(count)]
+
+def insert_translations_query(ideas: List[Idea], ids: List[int]) -> Tuple[str, list]:
+    """One multi-row INSERT for every translation of every idea."""
+    params = []
+    for idea_id, idea in zip(ids, ideas):
+        for lang, translation in idea.items():
+            params.extend(translation_params(idea_id, lang, translation))
+    rows = len(params) // 6
+    sql = (
+        "INSERT INTO content_translations (idea_id, language, title, content, hashtags, video_prompts) VALUES "
+        + ", ".join(["(%s, %s, %s, %s, %s, %s)"] * rows)
+    )
+    return sql, params
+
+def insert_media_query(ideas: List[Idea], ids: List[int]) -> Optional[Tuple[str, list]]:
+    """One multi-row INSERT for the Pexels media of every translation, or None if there is none."""
+    params = []
+    for idea_id, idea in zip(ids, ideas):
+        for lang, translation in idea.items():
+            # Media shared with an earlier language is stored once, under that language
+            if idea.own_media(lang):
+                for kind, field in MEDIA_FIELDS.items():
+                    for position, url in enumerate(getattr(translation, field)):
+                        params.extend((idea_id, lang, kind, position, url))
+            if idea.own_shots(lang):
+                for position, url in enumerate(translation.shot_videos):
+                    if url:
+                        params.extend((idea_id, lang, 'shot', position, url))
+    if not params:
+        return None
+    rows = len(params) // 5
+    sql = "INSERT INTO idea_media (idea_id, language, kind, position, url) VALUES " + ", ".join(["(%s, %s, %s, %s, %s)"] * rows)
+    return sql, params
+
+def translations_with_media(rows: List[Dict[str, Any]]) -> Idea:
+    """Fold translation rows (one per media item, via LEFT JOIN) into an Idea."""
+    translations = {}
+    for row in rows:
+        lang = row['language']
+        if lang not in translations:
+            translations[lang] = translation_from_row(row)
+        translation = translations[lang]
+        if row['media_kind'] == 'shot':
+            if not translation.shot_videos:
+                translation.shot_videos = [None] * len(translation.video_prompts)
+            if row['media_position'] < len(translation.shot_videos):
+                translation.shot_videos[row['media_position']] = row['media_url']
+        elif row['media_kind']:
+            getattr(translation, MEDIA_FIELDS[row['media_kind']]).append(row['media_url'])
+    # A translation without media of its own shares the first one's (see Idea.own_media)
+    shared = next((t for t in translations.values() if t.pexels_images or t.pexels_videos), None)
+    if shared:
+        for translation in translations.values():
+            if not translation.pexels_images and not translation.pexels_videos:
+                translation.pexels_images = shared.pexels_images
+                translation.pexels_videos = shared.pexels_videos
+    # Shots are shared too, by translations with as many video prompts
+    shots = next((t.shot_videos for t in translations.values() if t.shot_videos), None)
+    if shots:
+        for translation in translations.values():
+            if not translation.shot_videos and len(translation.video_prompts) == len(shots):
+                translation.shot_videos = list(shots)
+    return Idea(translations)
+
+def script_text(content: str) -> str:
+    """Plain text of a stored script (content column)."""
+    script = json.loads(content)
+    return " ".join(str(script.get(key, '')) for key in ('gancho', 'cuerpo', 'cierre'))
+
+def translation_from_row(row: Dict[str, Any]) -> Translation:
+    content = json.loads(row['content'])
+    return Translation(
+        title=row['title'],
+        script=Script(content.get('gancho', ''), content.get('cuerpo', ''), content.get('cierre', '')),
+        hashtags=row['hashtags'] or '',
+        video_prompts=json.loads(row['video_prompts']) if row['video_prompts'] else []
+    )
+
+def idea_page_query(user_id: int, category: str, limit: int, after: Optional[Cursor], before: Optional[Cursor]) -> Tuple[str, list]:
+    """Keyset query for one page of idea ids (fetches one extra row to detect more pages)."""
+    params = [user_id, category]
+    keyset = ""
+    if after:
+        keyset = "AND (i.created_at < %s OR (i.created_at = %s AND i.id < %s))"
+        params += [after[0], after[0], after[1]]
+    elif before:
+        keyset = "AND (i.created_at > %s OR (i.created_at = %s AND i.id > %s))"
+        params += [before[0], before[0], before[1]]
+    order = "ASC" if before else "DESC"
+    sql = f"""
+        SELECT i.id, i.created_at
+        FROM categories c
+        JOIN content_ideas i ON i.category_id = c.id
+        WHERE c.user_id = %s AND c.name = %s {keyset}
+        ORDER BY i.created_at {order}, i.id {order}
+        LIMIT %s
+    """
+    return sql, params + [limit + 1]
+
+def translations_in_query(idea_ids: List[int]) -> Tuple[str, list]:
+    placeholders = ", ".join(["%s"] * len(idea_ids))
+    sql = f"""
+        SELECT idea_id, language, title, content, hashtags, video_prompts
+        FROM content_translations
+        WHERE idea_id IN ({placeholders})
+    """
+    return sql, list(idea_ids)
+
+def page_ideas(rows: List[Dict[str, Any]], limit: int, before: Optional[Cursor]) -> Tuple[List[Dict[str, Any]], bool]:
+    """Trim the extra keyset row and return the page's ideas newest-first."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if before:
+        rows.reverse()
+    return [{'id': row['id'], 'created_at': row['created_at'], 'translations': {}} for row in rows], has_more
+
+def page_result(ideas: List[Dict[str, Any]], has_more: bool, after: Optional[Cursor], before: Optional[Cursor]) -> Dict[str, Any]:
+    first = (ideas[0]['created_at'], ideas[0]['id']) if ideas else None
+    last = (ideas[-1]['created_at'], ideas[-1]['id']) if ideas else None
+    if before:
+        prev_cursor, next_cursor = (first if has_more else None), last
+    else:
+        prev_cursor, next_cursor = (first if after else None), (last if has_more else None)
+    return {'ideas': ideas, 'prev_cursor': prev_cursor, 'next_cursor': next_cursor}
\ No newline at end of file
@@ -0,0 +1,179 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+LANGUAGES = ('es', 'en')
+TRANSLATION_FIELDS = ('title', 'script', 'hashtags', 'video_prompts', 'pexels_prompt')
+SCRIPT_FIELDS = ('gancho', 'cuerpo', 'cierre')
+
+# Response schema for Gemini's JSON mode (OpenAPI subset); mirrors Idea.from_dict
+_TRANSLATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "script": {
+            "type": "object",
+            "properties": {
+                "gancho": {"type": "string"},
+                "cuerpo": {"type": "string"},
+                "cierre": {"type": "string"},
+            },
+            "required": ["gancho", "cuerpo", "cierre"],
+        },
+        "hashtags": {"type": "string"},
+        "video_prompts": {"type": "array", "items": {"type": "string"}},
+        "pexels_prompt": {"type": "string"},
+    },
+    "required": ["title", "script", "hashtags", "video_prompts", "pexels_prompt"],
+}
+IDEA_SCHEMA = {
+    "type": "object",
+    "properties": {lang: _TRANSLATION_SCHEMA for lang in LANGUAGES},
+    "required": list(LANGUAGES),
+}
+
+def translation_schema(fields=TRANSLATION_FIELDS) -> Dict[str, Any]:
+    """Schema for a translation, or for just some of its fields (used to ask for missing parts)."""
+    return {
+        "type": "object",
+        "properties": {field: _TRANSLATION_SCHEMA["properties"][field] for field in fields},
+        "required": list(fields),
+    }
+
+def missing_fields(data: Dict[str, Any]) -> List[str]:
+    """Fields of a raw translation dict that are absent or empty (a partial script counts as missing)."""
+    missing = []
+    for field in TRANSLATION_FIELDS:
+        value = data.get(field)
+        if field == 'script':
+            complete = isinstance(value, dict) and all(isinstance(value.get(key), str) and value[key].strip() for key in SCRIPT_FIELDS)
+        elif field == 'video_prompts':
+            complete = isinstance(value, list) and any(value)
+        else:
+            complete = isinstance(value, str) and bool(value.strip())
+        if not complete:
+            missing.append(field)
+    return missing
+
+def _text(data: Dict[str, Any], *keys: str) -> str:
+    for key in keys:
+        value = data.get(key)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    raise ValueError(f"Missing or empty field: {keys[0]}")
+
+class Script:
+    """The three parts of a video script. Stored as {gancho, cuerpo, cierre} in every language."""
+    __slots__ = ('hook', 'body', 'closing')
+
+    def __init__(self, hook: str, body: str, closing: str):
+        self.hook = hook
+        self.body = body
+        self.closing = closing
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Script':
+        if not isinstance(data, dict):
+            raise ValueError("script must be an object")
+        # Older responses sometimes used English keys for the English version
+        return cls(_text(data, 'gancho', 'hook'), _text(data, 'cuerpo', 'body'), _text(data, 'cierre', 'closing'))
+
+    def to_dict(self) -> Dict[str, str]:
+        return {'gancho': self.hook, 'cuerpo': self.body, 'cierre': self.closing}
+
+class Translation:
+    """One language version of an idea, plus the media found for it."""
+    __slots__ = (
+        'title', 'script', 'hashtags', 'video_prompts', 'pexels_prompt',
+        'pexels_images', 'pexels_videos', 'pexels_video_files', 'shot_videos',
+    )
+
+    def __init__(self, title: str, script: Script, hashtags: str = '', video_prompts: List[str] = None, pexels_prompt: Optional[str] = None):
+        self.title = title
+        self.script = script
+        self.hashtags = hashtags
+        self.video_prompts = video_prompts or []
+        self.pexels_prompt = pexels_prompt
+        self.pexels_images: List[str] = []
+        self.pexels_videos: List[str] = []
+        self.pexels_video_files: List[Dict[str, Any]] = []
+        self.shot_videos: List[Optional[str]] = []
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Translation':
+        if not isinstance(data, dict):
+            raise ValueError("translation must be an object")
+        hashtags = data.get('hashtags') or ''
+        if isinstance(hashtags, list):
+            hashtags = " ".join(str(tag) for tag in hashtags)
+        prompts = data.get('video_prompts') or []
+        if not isinstance(prompts, list):
+            raise ValueError("video_prompts must be a list")
+        return cls(
+            title=_text(data, 'title'),
+            script=Script.from_dict(data.get('script')),
+            hashtags=hashtags,
+            video_prompts=[str(prompt) for prompt in prompts if prompt],
+            pexels_prompt=data.get('pexels_prompt') or None,
+        )
+
+class Idea:
+    """A generated idea: one Translation per language."""
+    __slots__ = ('translations',)
+
+    def __init__(self, translations: Dict[str, Translation]):
+        self.translations = translations
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Idea':
+        if not isinstance(data, dict):
+            raise ValueError("idea must be an object")
+        missing = [lang for lang in LANGUAGES if lang not in data]
+        if missing:
+            raise ValueError(f"Missing languages: {', '.join(missing)}")
+        return cls({lang: Translation.from_dict(data[lang]) for lang in LANGUAGES})
+
+    @property
+    def es(self) -> Optional[Translation]:
+        return self.translations.get('es')
+
+    @property
+    def en(self) -> Optional[Translation]:
+        return self.translations.get('en')
+
+    def get(self, lang: str) -> Optional[Translation]:
+        return self.translations.get(lang)
+
+    def items(self) -> Iterator[Tuple[str, Translation]]:
+        return iter(self.translations.items())
+
+    def own_media(self, lang: str) -> bool:
+        """False if an earlier language already has the same Pexels images and videos.
+
+        Media searches are shared by all languages, so usually only the first
+        translation's media needs to be shown or stored.
+        """
+        translation = self.translations[lang]
+        for other_lang, other in self.translations.items():
+            if other_lang == lang:
+                return True
+            if other.pexels_images == translation.pexels_images and other.pexels_videos == translation.pexels_videos:
+                return False
+        return True
+
+    def own_shots(self, lang: str) -> bool:
+        """False if an earlier language already has the same per-shot clips (see own_media)."""
+        shots = self.translations[lang].shot_videos
+        for other_lang, other in self.translations.items():
+            if other_lang == lang:
+                return True
+            if other.shot_videos == shots:
+                return False
+        return True
+
+    def __contains__(self, lang: str) -> bool:
+        return lang in self.translations
+
+    def __getitem__(self, lang: str) -> Translation:
+        return self.translations[lang]
+
+    def __bool__(self) -> bool:
+        return bool(self.translations)
@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# on_wait(position, eta_seconds); position 0 means the wait is over
+WaitCallback = Callable[[int, float], None]
+
+class AdaptiveLimiter:
+    """Process-wide AIMD limit on concurrent calls to a rate-limited API.
+
+    Each successful call made while the limit was in use adds 1/limit (about
+    +1 per round of calls). An overload multiplies the limit by `backoff`.
+    An overload is a 429/quota error, or the short-term latency of a kind of
+    call rising above `latency_tolerance` times its long-term average. The
+    limit is cut at most once per round: signals from calls started before
+    the last cut are ignored. Callers over the limit wait in FIFO order.
+    """
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 32,
+                 backoff: float = 0.5, latency_tolerance: float = 1.5, default_latency: float = 10.0):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.default_latency = default_latency
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting: deque = deque()
+        self._decreased_at = 0.0
+        self._latencies: Dict[str, List[float]] = {}  # kind -> [samples, short EWMA, long EWMA]
+        self._service_time: Optional[float] = None
+        self._counts = {'acquired': 0, 'waited': 0, 'overloads': 0, 'decreases': 0}
+
+    def _has_slot(self) -> bool:
+        return self._in_flight < int(self.limit)
+
+    def _eta(self, position: int) -> float:
+        # Slots free up about every service_time / limit seconds
+        service_time = self._service_time or self.default_latency
+        return position * service_time / int(self.limit)
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free and nobody is waiting (for optional work such as hedges)."""
+        with self._cond:
+            if self._waiting or not self._has_slot():
+                return False
+            self._in_flight += 1
+            self._counts['acquired'] += 1
+            return True
+
+    def acquire(self, timeout: float, on_wait: Optional[WaitCallback] = None) -> bool:
+        """Wait up to `timeout` seconds for a slot; False if none came in time.
+
+        While queued, on_wait(position, eta) is called from this thread each
+        time the position changes, and on_wait(0, 0) once the slot is taken.
+        """
+        deadline = time.monotonic() + timeout
+        ticket = object()
+        with self._cond:
+            self._counts['acquired'] += 1
+            if not self._waiting and self._has_slot():
+                self._in_flight += 1
+                return True
+            self._waiting.append(ticket)
+            self._counts['waited'] += 1
+        reported = None
+        while True:
+            with self._cond:
+                if self._waiting[0] is ticket and self._has_slot():
+                    self._waiting.popleft()
+                    self._in_flight += 1
+                    # The next in line may fit too
+                    self._cond.notify_all()
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(ticket)
+                    self._counts['acquired'] -= 1
+                    self._cond.notify_all()
+                    return False
+                position = self._waiting.index(ticket) + 1
+                if position == reported:
+                    self._cond.wait(remaining)
+                    continue
+                eta = self._eta(position)
+            reported = position
+            self._notify(on_wait, position, eta)
+        self._notify(on_wait, 0, 0.0)
+        return True
+
+    @staticmethod
+    def _notify(on_wait: Optional[WaitCallback], position: int, eta: float):
+        if on_wait is None:
+            return
+        try:
+            on_wait(position, eta)
+        except Exception as e:
+            logger.warning(f"Queue callback failed: {e}")
+
+    def release(self, kind: str, started: float, latency: Optional[float] = None, overloaded: bool = False):
+        """Return a slot. `latency` is given for successful calls; `overloaded` for 429/quota errors."""
+        with self._cond:
+            self._in_flight -= 1
+            if latency is not None:
+                stats = self._latencies.setdefault(kind, [0, latency, latency])
+                stats[0] += 1
+                stats[1] += 0.3 * (latency - stats[1])
+                stats[2] += 0.05 * (latency - stats[2])
+                self._service_time = latency if self._service_time is None else self._service_time + 0.1 * (latency - self._service_time)
+                if stats[0] >= 10 and stats[1] > self.latency_tolerance * stats[2]:
+                    overloaded = True
+            if overloaded:
+                self._counts['overloads'] += 1
+                if started >= self._decreased_at:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._decreased_at = time.monotonic()
+                    self._counts['decreases'] += 1
+                    logger.info(f"Gemini overloaded, concurrency limit down to {int(self.limit)}")
+            elif latency is not None and self._in_flight + 1 >= int(self.limit):
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self._in_flight,
+                'waiting': len(self._waiting),
+                **self._counts,
+            }
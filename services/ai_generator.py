@@ -1,77 +1,275 @@
 import json
 import logging
-import re
+import threading
+import time
+from datetime import timedelta
 import google.generativeai as genai
-from typing import Dict, Any, List
+from google.generativeai import caching
+from typing import Dict, Any, Callable, List, Optional
 from config.config import Config
+from models.idea import IDEA_SCHEMA, LANGUAGES, TRANSLATION_FIELDS, Idea, missing_fields, translation_schema
+from services.adaptive_limiter import AdaptiveLimiter, WaitCallback
+from services.gemini_client import HedgedCaller
+from services.json_stream import IncrementalJSONParser, salvage_json
 
 logger = logging.getLogger(__name__)
 
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+# Campos que vale la pena mostrar mientras la respuesta llega. Gemini devuelve las propiedades en
+# orden alfabético ("en" antes que "es"), así que sirven los de cualquier idioma
+PREVIEW_FIELDS = {
+    (lang,) + field
+    for lang in LANGUAGES
+    for field in (('title',), ('script', 'gancho'), ('script', 'cuerpo'), ('script', 'cierre'))
+}
+
+SYSTEM_INSTRUCTION = """
+Genera una idea de contenido para TikTok (45 segundos a 1 minuto) en la categoría que se indique, sin repetir las ideas existentes que se mencionen.
+Debe tener:
+1. Un título corto.
+2. Un guion dividido en 3 partes: gancho, cuerpo, cierre.
+3. Una lista de hashtags virales para TikTok.
+4. Una lista de prompts altamente detallados y personalizados para generar videos cortos de alta calidad que visualicen y refuercen específicamente la idea generada. Cada video corto debe durar máximo entre 5 y 8 segundos, ya que el video total es de 45 segundos a 1 minuto. Cada prompt debe ser único y adaptado al título, guion y hashtags de la idea, incluyendo elementos visuales específicos, emociones relevantes, estilo dinámico de TikTok, música sugerida que encaje con el tema, efectos atractivos y duración aproximada. Los videos deben reflejar fielmente y de manera personalizada el contenido del guion, generando alto valor, engagement y conexión emocional con los usuarios. Decide la cantidad de prompts según sea necesario para cubrir la idea completa (mínimo 3, máximo 10 por idioma).
+5. Un prompt adicional orientado a búsqueda en Pexels para cada idea, que describa de forma breve y precisa lo que se debe buscar en Pexels para encontrar imágenes o videos frontales relevantes para la idea. Este prompt debe ser claro, concreto y fácil de usar como término de búsqueda en Pexels.
+Devuélvelo con dos versiones: "es" (español) y "en" (inglés). En ambas el guion usa las claves "gancho", "cuerpo" y "cierre".
+""".strip()
+
+IDEA_CONFIG = genai.GenerationConfig(response_mime_type="application/json", response_schema=IDEA_SCHEMA)
+
+LANGUAGE_NAMES = {'es': 'español', 'en': 'inglés'}
+
+FIELD_HINTS = {
+    'title': 'un título corto',
+    'script': 'el guion en 3 partes (gancho, cuerpo, cierre) para un video de 45 segundos a 1 minuto',
+    'hashtags': 'hashtags virales para TikTok en un solo texto',
+    'video_prompts': 'entre 3 y 10 prompts detallados para generar videos cortos (5 a 8 segundos cada uno) que ilustren el guion',
+    'pexels_prompt': 'un término de búsqueda breve y concreto para encontrar imágenes o videos en Pexels',
+}
+
 class AIGenerator:
     """Handles AI content generation using Google Gemini."""
     
     def __init__(self):
        genai.configure(api_key=Config.get_google_api_key())
-       self.model = genai.GenerativeModel("gemini-2.5-flash-lite")
+       # Modelos en orden de preferencia: los siguientes reciben los hedges y reintentos
+       self.model_names = Config.get_gemini_models()
+       # El modo JSON con esquema garantiza JSON válido con la forma de Idea; las
+       # instrucciones fijas se fijan una vez como system instruction
+       self.models = [
+           genai.GenerativeModel(name, generation_config=IDEA_CONFIG, system_instruction=SYSTEM_INSTRUCTION)
+           for name in self.model_names
+       ]
+       # Las reparaciones llevan sus propias instrucciones
+       self.repair_models = [genai.GenerativeModel(name) for name in self.model_names]
+       # Un solo limitador para todo el proceso: todas las llamadas comparten la señal de 429/latencia
+       self.limiter = AdaptiveLimiter(
+           initial=Config.get_gemini_concurrency(),
+           min_limit=Config.get_gemini_min_concurrency(),
+           max_limit=Config.get_gemini_max_concurrency()
+       )
+       max_attempts = Config.get_gemini_max_attempts()
+       self.caller = HedgedCaller(
+           self.limiter,
+           max_workers=Config.get_generation_workers() * max_attempts,
+           deadline=Config.get_gemini_deadline(),
+           queue_timeout=Config.get_gemini_queue_timeout(),
+           hedge=Config.get_gemini_hedge(),
+           hedge_delay=Config.get_gemini_hedge_delay(),
+           max_attempts=max_attempts,
+           backoff=Config.get_gemini_retry_backoff()
+       )
+       self.streaming = Config.get_stream_generation()
+       self.cache_ttl = Config.get_gemini_cache_ttl()
+       self._cached_model = None
+       self._cache_expires = 0.0
+       self._lock = threading.Lock()
+       # Refreshing the cached context is a network call; it must not hold up _record/stats()
+       self._cache_lock = threading.Lock()
+       self._stats = {'calls': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'output_tokens': 0, 'latency': 0.0}
     
-    def generate_idea(self, category: str, existing_titles: List[str] = None) -> Dict[str, Any]:
-        """Generate idea for a category."""
-        existing_str = ""
-        if existing_titles:
-            existing_str = f"Avoid repeating these existing ideas: {', '.join(existing_titles)}. "
-        
-        prompt = f"""
-        Genera una idea de contenido para TikTok en la categoría: {category} (45 segundos a 1 minuto).
-        {existing_str}
-        Debe tener:
-        1. Un título corto.
-        2. Un guion dividido en 3 partes: gancho, cuerpo, cierre.
-        3. Una lista de hashtags virales para TikTok.
-        4. Una lista de prompts altamente detallados y personalizados para generar videos cortos de alta calidad que visualicen y refuercen específicamente la idea generada. Cada video corto debe durar máximo entre 5 y 8 segundos, ya que el video total es de 45 segundos a 1 minuto. Cada prompt debe ser único y adaptado al título, guion y hashtags de la idea, incluyendo elementos visuales específicos, emociones relevantes, estilo dinámico de TikTok, música sugerida que encaje con el tema, efectos atractivos y duración aproximada. Los videos deben reflejar fielmente y de manera personalizada el contenido del guion, generando alto valor, engagement y conexión emocional con los usuarios. Decide la cantidad de prompts según sea necesario para cubrir la idea completa (mínimo 3, máximo 10 por idioma).
-        5. Un prompt adicional orientado a búsqueda en Pexels para cada idea, que describa de forma breve y precisa lo que se debe buscar en Pexels para encontrar imágenes o videos frontales relevantes para la idea. Este prompt debe ser claro, concreto y fácil de usar como término de búsqueda en Pexels.
-        Devuélvelo en JSON con dos versiones: "es" (español) y "en" (inglés).
-        Responde SOLO con el JSON, sin texto adicional.
-        Formato exacto:
-        {{
-          "es": {{
-            "title": "Título en español",
-            "script": {{
-              "gancho": "Gancho en español",
-              "cuerpo": "Cuerpo en español",
-              "cierre": "Cierre en español"
-            }},
-            "hashtags": "#Hashtag1 #Hashtag2",
-            "video_prompts": ["Prompt detallado para video 1 en español", "Prompt detallado para video 2 en español"],
-            "pexels_prompt": "Prompt breve para buscar en Pexels en español"
-          }},
-          "en": {{
-            "title": "Title in English",
-            "script": {{
-              "gancho": "Hook in English",
-              "cuerpo": "Body in English",
-              "cierre": "Closing in English"
-            }},
-            "hashtags": "#Hashtag1 #Hashtag2",
-            "video_prompts": ["Detailed prompt for video 1 in English", "Detailed prompt for video 2 in English"],
-            "pexels_prompt": "Brief prompt for Pexels search in English"
-          }}
-        }}
+    def _idea_models(self) -> List[genai.GenerativeModel]:
+        """Models for idea calls; the first is backed by a provider-side cached context when enabled."""
+        if not self.cache_ttl:
+            return self.models
+        with self._cache_lock:
+            if self._cached_model is None or time.monotonic() > self._cache_expires:
+                try:
+                    cached = caching.CachedContent.create(
+                        model=f"models/{self.model_names[0]}",
+                        display_name="idea-instructions",
+                        system_instruction=SYSTEM_INSTRUCTION,
+                        ttl=timedelta(seconds=self.cache_ttl)
+                    )
+                    self._cached_model = genai.GenerativeModel.from_cached_content(cached, generation_config=IDEA_CONFIG)
+                    # Renew a minute early so no call lands on an expired cache
+                    self._cache_expires = time.monotonic() + max(self.cache_ttl - 60, self.cache_ttl / 2)
+                except Exception as e:
+                    # E.g. the instructions are under the model's minimum cacheable size
+                    logger.warning(f"Context caching unavailable, using the system instruction: {e}")
+                    self.cache_ttl = 0
+                    return self.models
+            return [self._cached_model] + self.models[1:]
+    
+    def _record(self, kind: str, started: float, response):
+        latency = time.perf_counter() - started
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', 0) or 0
+        cached_tokens = getattr(usage, 'cached_content_token_count', 0) or 0
+        output_tokens = getattr(usage, 'candidates_token_count', 0) or 0
+        logger.info(f"Gemini {kind}: {latency:.2f}s, prompt {prompt_tokens} tokens ({cached_tokens} cached), output {output_tokens} tokens")
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['prompt_tokens'] += prompt_tokens
+            self._stats['cached_tokens'] += cached_tokens
+            self._stats['output_tokens'] += output_tokens
+            self._stats['latency'] += latency
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self._stats['calls']
+            return {
+                'calls': calls,
+                'prompt_tokens_avg': self._stats['prompt_tokens'] / calls if calls else 0.0,
+                'cached_tokens_avg': self._stats['cached_tokens'] / calls if calls else 0.0,
+                'output_tokens_avg': self._stats['output_tokens'] / calls if calls else 0.0,
+                'latency_avg': self._stats['latency'] / calls if calls else 0.0,
+                **self.caller.stats(),
+                'limiter': self.limiter.stats(),
+            }
+    
+    def generate_idea(self, category: str, existing_titles: List[str] = None, on_progress: Optional[ProgressCallback] = None,
+                      on_queue: Optional[WaitCallback] = None) -> Idea:
+        """Generate idea for a category.
+
+        With `on_progress` (and streaming enabled) the response is streamed and
+        on_progress(partial) is called from this thread each time a preview
+        field (Spanish title or script part) is complete. `on_queue(position, eta)`
+        is called while the request waits for a Gemini slot.
         """
+        avoid = f"\nEvita repetir estas ideas existentes: {', '.join(existing_titles)}." if existing_titles else ""
+        # Las instrucciones fijas van en SYSTEM_INSTRUCTION; aquí solo lo que cambia
+        prompt = f"Categoría: {category}{avoid}"
         
-        response = self.model.generate_content(prompt)
-        text = response.text.strip()
-        json_match = re.search(r'```json\s*(.*?)\s*```', text, re.DOTALL)
-        if json_match:
-            json_text = json_match.group(1)
+        if on_progress and self.streaming:
+            text = self._stream(prompt, on_progress, on_queue)
         else:
-            json_text = text
-        
-        json_text = re.sub(r',(\s*[}\]])', r'\1', json_text)
-        
+            started = time.perf_counter()
+            response = self.caller.call(
+                "idea", self._idea_models(),
+                lambda model, timeout: model.generate_content(prompt, request_options={'timeout': timeout}),
+                on_wait=on_queue
+            )
+            self._record("idea", started, response)
+            text = response.text
+        return self._parse_response(text, category)
+    
+    def _stream(self, prompt: str, on_progress: ProgressCallback, on_queue: Optional[WaitCallback] = None) -> str:
+        parser = IncrementalJSONParser()
+        parts = []
+        started = time.perf_counter()
+        # The timeout still bounds the whole stream, and the limiter slot is held until it is read
+        stream = self.caller.call(
+            "idea (stream)", self._idea_models(),
+            lambda model, timeout: model.generate_content(prompt, stream=True, request_options={'timeout': timeout}),
+            on_wait=on_queue, stream=True
+        )
+        try:
+            for chunk in stream:
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. only a finish reason)
+                    continue
+                parts.append(chunk_text)
+                if parser is None:
+                    continue
+                try:
+                    completed = parser.feed(chunk_text)
+                except Exception as e:
+                    # Only the preview is lost; the full text is still parsed (and repaired) at the end
+                    logger.warning(f"Stopping generation preview, unreadable chunk: {e}")
+                    parser = None
+                    continue
+                if PREVIEW_FIELDS.intersection(completed):
+                    try:
+                        on_progress(json.loads(json.dumps(parser.values)))
+                    except Exception as e:
+                        logger.warning(f"Progress callback failed: {e}")
+        finally:
+            stream.close()
+        # Usage metadata arrives with the last chunk
+        self._record("idea (stream)", started, stream.response)
+        return "".join(parts)
+    
+    def _parse_response(self, response_text: str, category: str) -> Idea:
         try:
-            return json.loads(json_text)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON from AI response: {e}")
-            logger.error(f"Cleaned JSON text: {json_text}")
-            logger.error(f"Response text: {response.text}")
-            raise ValueError("AI did not return valid JSON")
\ No newline at end of file
+            return Idea.from_dict(json.loads(response_text, strict=False))
+        except ValueError as e:
+            # JSONDecodeError is a ValueError too; usually a truncated response or a missing block
+            logger.warning(f"Invalid idea in AI response, salvaging what is complete: {e}")
+        partial = self._salvage(response_text)
+        if not any(partial.values()):
+            logger.error(f"Nothing to salvage in AI response: {response_text}")
+            raise ValueError("AI did not return a valid idea")
+        for lang in LANGUAGES:
+            missing = missing_fields(partial[lang])
+            if not missing:
+                continue
+            source = next((other for other in LANGUAGES if other != lang and not missing_fields(partial[other])), None)
+            if len(missing) == len(TRANSLATION_FIELDS) and source:
+                logger.info(f"Requesting the missing '{lang}' translation")
+                partial[lang] = self._translate(partial[source], lang)
+            else:
+                logger.info(f"Requesting missing fields for '{lang}': {', '.join(missing)}")
+                partial[lang].update(self._complete(category, lang, partial[lang], missing))
+        try:
+            return Idea.from_dict(partial)
+        except ValueError as e:
+            logger.error(f"Invalid idea after repair: {e}")
+            raise ValueError("AI did not return a valid idea") from e
+    
+    @staticmethod
+    def _salvage(response_text: str) -> Dict[str, Dict[str, Any]]:
+        """Every complete field of each translation; lists cut off mid-way are dropped."""
+        values, closed = salvage_json(response_text)
+        partial = {}
+        for lang in LANGUAGES:
+            data = values.get(lang)
+            data = dict(data) if isinstance(data, dict) else {}
+            if 'video_prompts' in data and (lang, 'video_prompts') not in closed:
+                del data['video_prompts']
+            partial[lang] = data
+        return partial
+    
+    def _ask_json(self, prompt: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+        config = genai.GenerationConfig(response_mime_type="application/json", response_schema=schema)
+        started = time.perf_counter()
+        response = self.caller.call(
+            "repair", self.repair_models,
+            lambda model, timeout: model.generate_content(prompt, generation_config=config, request_options={'timeout': timeout})
+        )
+        self._record("repair", started, response)
+        data = json.loads(response.text)
+        if not isinstance(data, dict):
+            raise ValueError("AI did not return an object")
+        return data
+    
+    def _translate(self, source: Dict[str, Any], lang: str) -> Dict[str, Any]:
+        prompt = f"""
+        Traduce al {LANGUAGE_NAMES[lang]} esta idea de contenido para TikTok, adaptando los hashtags y el término de búsqueda de Pexels.
+        El guion usa las claves "gancho", "cuerpo" y "cierre".
+        {json.dumps(source, ensure_ascii=False)}
+        """
+        return self._ask_json(prompt, translation_schema())
+    
+    def _complete(self, category: str, lang: str, data: Dict[str, Any], missing: List[str]) -> Dict[str, Any]:
+        needed = "\n".join(f"- {field}: {FIELD_HINTS[field]}" for field in missing)
+        prompt = f"""
+        Esta es una idea de contenido para TikTok en la categoría {category}, en {LANGUAGE_NAMES[lang]}, a la que le faltan partes:
+        {json.dumps(data, ensure_ascii=False)}
+        Devuelve solo estas partes, en {LANGUAGE_NAMES[lang]} y coherentes con lo anterior:
+        {needed}
+        """
+        completed = self._ask_json(prompt, translation_schema(missing))
+        return {field: completed[field] for field in missing if field in completed}
\ No newline at end of file
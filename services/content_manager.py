@@ -1,7 +1,16 @@
-from typing import Dict, Any
+import logging
+from typing import Optional
 from database.database import DatabaseHandler
-from services.ai_generator import AIGenerator
+from models.idea import Idea
+from services.adaptive_limiter import WaitCallback
+from services.ai_generator import AIGenerator, ProgressCallback
 from services.notion_handler import NotionHandler
+from services.pexels_searcher import PexelsSearcher
+from services.seen_media import SeenMediaIndex
+from services.similarity_index import SimilarityIndex
+from config.config import Config
+
+logger = logging.getLogger(__name__)
 
 class ContentManager:
     """Manages content operations."""
@@ -10,28 +19,79 @@ class ContentManager:
         self.db_handler = db_handler
         self.ai_generator = ai_generator
         self.notion_handler = NotionHandler()
+        self.pexels = PexelsSearcher()
+        self.seen_media = SeenMediaIndex(db_handler)
+        self.similarity = SimilarityIndex(db_handler)
+        self.similar_top_k = Config.get_similar_titles_in_prompt()
+        self.similarity_threshold = Config.get_similarity_threshold()
+        self.similarity_retries = Config.get_similarity_retries()
+        self.shot_search = Config.get_shot_search()
+        self.shot_search_budget = Config.get_shot_search_budget()
     
-    def generate_and_save_idea(self, user_id: int, category: str) -> Dict[str, Any]:
+    def generate_and_save_idea(self, user_id: int, category: str, on_progress: Optional[ProgressCallback] = None,
+                               on_queue: Optional[WaitCallback] = None) -> Idea:
         """Generate and save idea, and search images/videos with Pexels."""
-        from services.pexels_searcher import PexelsSearcher
-        existing_ideas = self.db_handler.get_user_ideas(user_id, category)
-        existing_titles = list(set(idea['title'] for idea in existing_ideas if 'title' in idea))
-        ideas = self.ai_generator.generate_idea(category, existing_titles)
-        # Buscar imágenes/videos usando los prompts generados por la IA
-        pexels = PexelsSearcher()
-        for lang in ['es', 'en']:
-            pexels_prompt = ideas.get(lang, {}).get('pexels_prompt', None)
-            images = []
-            videos = []
-            if pexels_prompt:
-                images = pexels.search_images(pexels_prompt, per_page=2, orientation='portrait')
-                videos = pexels.search_videos(pexels_prompt, per_page=8, orientation='portrait')
+        ideas = self._generate_distinct(user_id, category, on_progress, on_queue)
+        # Buscar imágenes/videos usando los prompts generados por la IA (todas las búsquedas a la vez)
+        prompts = {lang: translation.pexels_prompt for lang, translation in ideas.items()}
+        media = self.pexels.search_media(
+            prompts, images=2, videos=8, orientation='portrait',
+            seen_images=self.seen_media.seen(user_id, 'photo'),
+            seen_videos=self.seen_media.seen(user_id, 'video')
+        )
+        for lang, translation in ideas.items():
+            image_files, video_files = media.get(lang, ([], []))
             # Guardar los resultados en la idea
-            ideas[lang]['pexels_images'] = images
-            ideas[lang]['pexels_videos'] = videos
-            ideas[lang]['pexels_prompt'] = pexels_prompt
+            translation.pexels_images = [photo['link'] for photo in image_files]
+            translation.pexels_videos = [video['link'] for video in video_files]
+            translation.pexels_video_files = video_files
+            self.seen_media.mark(user_id, 'photo', [photo['id'] for photo in image_files])
+            self.seen_media.mark(user_id, 'video', [video['id'] for video in video_files])
+        if self.shot_search:
+            self._add_shot_videos(user_id, ideas)
         # Guardar en la base de datos
         idea_id = self.db_handler.insert_idea(user_id, category, ideas)
+        self.similarity.get(user_id, category).add(ideas.es.title, self._script_text(ideas.es))
+        self.seen_media.save(user_id)
         # Guardar en Notion
         self.notion_handler.create_content_page(ideas, category)
-        return ideas
\ No newline at end of file
+        return ideas
+    
+    def _generate_distinct(self, user_id: int, category: str, on_progress: Optional[ProgressCallback],
+                           on_queue: Optional[WaitCallback] = None) -> Idea:
+        """Generate an idea that isn't a near-copy of one the user already has in this category.
+
+        Only the top-k most typical past titles go into the prompt, so it stays
+        the same size however long the history is; a result above the
+        similarity threshold is regenerated with its look-alike added.
+        """
+        index = self.similarity.get(user_id, category)
+        avoid = index.representative(self.similar_top_k)
+        for attempt in range(self.similarity_retries + 1):
+            ideas = self.ai_generator.generate_idea(category, avoid, on_progress=on_progress, on_queue=on_queue)
+            score, closest = index.nearest(ideas.es.title, self._script_text(ideas.es))
+            if score < self.similarity_threshold:
+                break
+            logger.info(f"Generated idea '{ideas.es.title}' is {score:.2f} similar to '{closest}' (attempt {attempt + 1})")
+            if closest not in avoid:
+                avoid = avoid + [closest]
+        return ideas
+    
+    @staticmethod
+    def _script_text(translation) -> str:
+        script = translation.script
+        return f"{script.hook} {script.body} {script.closing}"
+    
+    def _add_shot_videos(self, user_id: int, ideas: Idea):
+        """Attach one b-roll clip per video prompt as 'shot_videos' (aligned with video_prompts)."""
+        # Se busca con los prompts del idioma preferido; las traducciones tienen los mismos planos
+        lang = self.pexels.prefer_language if self.pexels.prefer_language in ideas else 'en'
+        prompts = ideas[lang].video_prompts if lang in ideas else []
+        if not prompts:
+            return
+        shots = self.pexels.search_shots(prompts, self.shot_search_budget, seen=self.seen_media.seen(user_id, 'video'))
+        self.seen_media.mark(user_id, 'video', [shot['id'] for shot in shots if shot])
+        links = [shot['link'] if shot else None for shot in shots]
+        for _, translation in ideas.items():
+            if len(translation.video_prompts) == len(links):
+                translation.shot_videos = list(links)
\ No newline at end of file
@@ -0,0 +1,240 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+from google.api_core import exceptions as api_exceptions
+from services.adaptive_limiter import AdaptiveLimiter, WaitCallback
+
+logger = logging.getLogger(__name__)
+
+# Transient failures: worth another attempt (on the next model) after a backoff
+RETRYABLE_ERRORS = (
+    api_exceptions.ResourceExhausted,
+    api_exceptions.TooManyRequests,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.InternalServerError,
+    api_exceptions.BadGateway,
+    api_exceptions.GatewayTimeout,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.Aborted,
+    api_exceptions.Unknown,
+    ConnectionError,
+    TimeoutError,
+)
+
+OVERLOAD_ERRORS = (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests)
+
+def is_retryable(error: BaseException) -> bool:
+    return isinstance(error, RETRYABLE_ERRORS)
+
+class LimitedStream:
+    """A streamed response that holds its limiter slot until it is read to the end or closed.
+
+    The slot is released with the full stream latency when the stream is
+    exhausted, as an overload when it fails mid-way with a 429, and without a
+    latency sample on close() (an abandoned or partly read stream).
+    """
+
+    def __init__(self, response: Any, limiter: AdaptiveLimiter, kind: str, launched: float):
+        self.response = response
+        self._limiter = limiter
+        self._kind = kind
+        self._launched = launched
+        self._released = False
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        try:
+            for chunk in self.response:
+                yield chunk
+        except Exception as e:
+            self._release(overloaded=isinstance(e, OVERLOAD_ERRORS))
+            raise
+        self._release(time.monotonic() - self._launched)
+
+    def _release(self, latency: Optional[float] = None, overloaded: bool = False):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._limiter.release(self._kind, self._launched, latency, overloaded)
+
+    def close(self):
+        self._release()
+
+class HedgedCaller:
+    """Runs a blocking model call with a deadline, a hedged second attempt and fallbacks.
+
+    The first attempt goes to the first model. If it has not finished after
+    the p95 of recent latencies, one hedge is sent to the next model; the
+    first attempt to succeed wins. A retryable error starts a new attempt on
+    the next model after a jittered exponential backoff; any other error is
+    raised at once. Losers are cancelled if they have not started, and are
+    otherwise abandoned: their result is dropped (a stream is closed) and
+    their own timeout is the remaining deadline.
+
+    Every attempt holds a slot of the shared `limiter`. The first attempt and
+    retries queue for one; a hedge is only sent if a slot is free right away,
+    so hedging never adds load when the API is already saturated. A streamed
+    call keeps its slot until the caller has read the LimitedStream to the end
+    or closed it.
+    """
+
+    def __init__(self, limiter: AdaptiveLimiter, max_workers: int, deadline: float, queue_timeout: float = 300.0,
+                 hedge: bool = True, hedge_delay: float = 15.0, min_hedge_delay: float = 2.0, max_attempts: int = 3,
+                 backoff: float = 1.0):
+        self.limiter = limiter
+        self.queue_timeout = queue_timeout
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini")
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {}
+        self._counts = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'retries': 0, 'timeouts': 0}
+
+    def _hedge_after(self, latencies) -> float:
+        """p95 of recent successful latencies for a kind of call (the default until there are 20)."""
+        latencies = sorted(latencies)
+        if len(latencies) < 20:
+            return self.hedge_delay
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return min(max(p95, self.min_hedge_delay), self.deadline)
+
+    def _record(self, kind: str, latency: float):
+        with self._lock:
+            self._latencies.setdefault(kind, deque(maxlen=200)).append(latency)
+
+    def _count(self, key: str):
+        with self._lock:
+            self._counts[key] += 1
+
+    def _attempt(self, kind: str, request: Callable[[Any, float], Any], model: Any, timeout: float,
+                 launched: float, stream: bool) -> Any:
+        try:
+            result = request(model, timeout)
+        except Exception as e:
+            self.limiter.release(kind, launched, overloaded=isinstance(e, OVERLOAD_ERRORS))
+            raise
+        if stream:
+            return LimitedStream(result, self.limiter, kind, launched)
+        self.limiter.release(kind, launched, time.monotonic() - launched)
+        return result
+
+    @staticmethod
+    def _close_result(future: Future):
+        if not future.cancelled() and future.exception() is None and isinstance(future.result(), LimitedStream):
+            future.result().close()
+
+    def call(self, kind: str, models: Sequence[Any], request: Callable[[Any, float], Any],
+             on_wait: Optional[WaitCallback] = None, stream: bool = False) -> Any:
+        """Return request(model, timeout) from the first attempt that succeeds.
+
+        `kind` groups calls with comparable latency (for the hedge delay);
+        attempts go through `models` in order, wrapping around. `on_wait` is
+        told the queue position and ETA while waiting for a limiter slot.
+        With `stream`, request returns once the first chunk is in (so hedging
+        races on time to first chunk) and the result is a LimitedStream the
+        caller must exhaust or close.
+        """
+        self._count('calls')
+        # The deadline runs from when the first attempt gets a slot; queueing has its own limit
+        if not self.limiter.acquire(self.queue_timeout, on_wait):
+            self._count('timeouts')
+            raise TimeoutError(f"No Gemini slot freed up within {self.queue_timeout:g}s")
+        started = time.monotonic()
+        deadline = started + self.deadline
+        hedge_at = None
+        if self.hedge and self.max_attempts > 1:
+            with self._lock:
+                hedge_at = started + self._hedge_after(self._latencies.get(kind, ()))
+        hedge_attempt = None
+        pending: Dict[Future, Tuple[int, float]] = {}
+        attempts = 0
+        failures = 0
+        retry_at = None
+        last_error = None
+
+        def launch():
+            # The caller holds a limiter slot for this attempt
+            nonlocal attempts
+            model = models[attempts % len(models)]
+            now = time.monotonic()
+            future = self._executor.submit(self._attempt, kind, request, model, max(deadline - now, 0.1), now, stream)
+            pending[future] = (attempts, now)
+            attempts += 1
+
+        launch()
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    self._count('timeouts')
+                    raise TimeoutError(f"No model answered within {self.deadline:g}s") from last_error
+                wake = min(t for t in (deadline, hedge_at, retry_at) if t is not None)
+                if pending:
+                    done, _ = wait(list(pending), timeout=max(wake - now, 0), return_when=FIRST_COMPLETED)
+                else:
+                    # Only a backoff to wait out
+                    time.sleep(max(wake - now, 0))
+                    done = ()
+                for future in done:
+                    attempt, launched = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        if not is_retryable(e):
+                            raise
+                        failures += 1
+                        last_error = e
+                        logger.warning(f"Gemini {kind} attempt {attempt + 1} failed, retryable: {e}")
+                        if attempts < self.max_attempts and retry_at is None:
+                            backoff = self.backoff * 2 ** (failures - 1)
+                            retry_at = time.monotonic() + random.uniform(backoff / 2, backoff)
+                        continue
+                    self._record(kind, time.monotonic() - launched)
+                    if attempt == hedge_attempt:
+                        self._count('hedge_wins')
+                    return result
+                now = time.monotonic()
+                if retry_at is not None and now >= retry_at:
+                    retry_at = None
+                    # While another attempt is still running it carries on the race; a retry
+                    # is scheduled again if that one fails too
+                    if not pending:
+                        if not self.limiter.acquire(deadline - now, on_wait):
+                            continue
+                        self._count('retries')
+                        launch()
+                if hedge_at is not None and now >= hedge_at:
+                    hedge_at = None
+                    if pending and attempts < self.max_attempts and self.limiter.try_acquire():
+                        self._count('hedged')
+                        logger.info(f"Gemini {kind} slow, sending a hedged request")
+                        hedge_attempt = attempts
+                        launch()
+                if not pending and retry_at is None:
+                    raise last_error
+        finally:
+            for future, (_, launched) in pending.items():
+                # An attempt cancelled before it ran never releases its own slot
+                if future.cancel():
+                    self.limiter.release(kind, launched)
+                else:
+                    # A losing stream would otherwise hold its slot forever
+                    future.add_done_callback(self._close_result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counts)
+            stats['hedge_delay'] = {kind: self._hedge_after(latencies) for kind, latencies in self._latencies.items()}
+        return stats
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
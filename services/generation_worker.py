@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from config.config import Config
+from services.content_manager import ContentManager
+
+logger = logging.getLogger(__name__)
+
+DoneCallback = Callable[[Optional[Dict[str, Any]], Optional[BaseException]], Awaitable[None]]
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+QueueCallback = Callable[[int, float], Awaitable[None]]
+
+class GenerationWorker:
+    """Runs idea generation jobs on a bounded thread pool, off the event loop."""
+
+    def __init__(self, content_manager: ContentManager, max_workers: int = None, max_pending: int = None):
+        self.content_manager = content_manager
+        self.max_workers = max_workers or Config.get_generation_workers()
+        self.max_pending = max_pending or Config.get_generation_queue_size()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="generation")
+        # Running + queued jobs never exceed this, so a burst cannot pile up unbounded work
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+        self._lock = threading.Lock()
+        self._active_users: Set[int] = set()
+
+    def submit(self, user_id: int, category: str, on_done: DoneCallback, on_progress: Optional[ProgressCallback] = None,
+               on_queue: Optional[QueueCallback] = None) -> bool:
+        """Queue a generation job and return immediately.
+
+        `on_done(ideas, error)` is awaited on the caller's event loop once the job
+        finishes; `on_progress(partial)` is scheduled there (in order) whenever the
+        streamed response has new preview fields, and `on_queue(position, eta)`
+        while the job waits its turn for Gemini. Returns False when the user
+        already has a job running or the pool is full.
+        """
+        with self._lock:
+            if user_id in self._active_users:
+                return False
+            if not self._slots.acquire(blocking=False):
+                return False
+            self._active_users.add(user_id)
+
+        loop = asyncio.get_running_loop()
+        progress = None
+        if on_progress:
+            def progress(partial: Dict[str, Any]):
+                # Fire and forget: the generation thread must not wait for Telegram
+                asyncio.run_coroutine_threadsafe(on_progress(partial), loop).add_done_callback(self._log_callback_error)
+        queue = None
+        if on_queue:
+            def queue(position: int, eta: float):
+                asyncio.run_coroutine_threadsafe(on_queue(position, eta), loop).add_done_callback(self._log_callback_error)
+        future = self.executor.submit(self.content_manager.generate_and_save_idea, user_id, category, progress, queue)
+
+        def _done(fut: Future):
+            with self._lock:
+                self._active_users.discard(user_id)
+                self._slots.release()
+            error = fut.exception()
+            ideas = None if error else fut.result()
+            try:
+                callback = asyncio.run_coroutine_threadsafe(on_done(ideas, error), loop)
+            except RuntimeError:
+                # The bot stopped while the job was running; nobody is left to notify
+                logger.warning(f"Generation for user {user_id} finished after shutdown")
+                return
+            callback.add_done_callback(self._log_callback_error)
+
+        future.add_done_callback(_done)
+        return True
+
+    @staticmethod
+    def _log_callback_error(fut: Future):
+        if not fut.cancelled() and fut.exception():
+            logger.error(f"Error delivering generation update: {fut.exception()}")
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
\ No newline at end of file
@@ -0,0 +1,156 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+Path = Tuple[str, ...]
+
+class IncrementalJSONParser:
+    """Reads a JSON object as it streams in and reports each string field the moment it closes.
+
+    Object members with string values and arrays of strings are tracked
+    (deeper nesting is skipped). Anything before the first '{' (such as a
+    ```json fence) is ignored. `values` holds the completed string fields as a
+    nested dict; `closed` the paths of arrays and objects that were closed, so
+    a list cut off mid-way can be told apart from a complete one.
+
+    A string only counts as closed once the next significant character is
+    , : } or ]; otherwise the quote was an unescaped one inside the text and
+    reading continues. A field that shows up twice is dropped and listed in
+    `corrupt` rather than overwritten, so it gets asked for again.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+        self.closed: Set[Path] = set()
+        self.corrupt: Set[Path] = set()
+        self._started = False
+        self._stack: List[List[Any]] = []  # [container, key] per open container
+        self._in_string = False
+        self._escape = False
+        self._chars: List[str] = []
+        self._pending: Optional[str] = None  # raw text of a string whose closing quote is unconfirmed
+        self._gap: List[str] = []
+        self._expect_key = False
+
+    def feed(self, text: str) -> List[Path]:
+        """Consume a chunk; return the paths of string fields completed in it."""
+        completed = []
+        for char in text:
+            if self._in_string:
+                self._string_char(char)
+                continue
+            if self._pending is not None:
+                if char.isspace():
+                    self._gap.append(char)
+                    continue
+                if char not in ',:}]':
+                    # A stray quote inside the text, e.g. "El "mejor" desayuno": put it back and keep reading
+                    logger.warning("Unescaped quote in streamed JSON string, reading it as text")
+                    self._chars = [self._pending, '"'] + self._gap
+                    self._pending = None
+                    self._in_string = True
+                    self._string_char(char)
+                    continue
+                path = self._commit()
+                if path:
+                    completed.append(path)
+            if not self._started:
+                if char == '{':
+                    self._started = True
+                    self._open('{')
+                continue
+            if not self._stack:
+                continue
+            if char == '"':
+                self._in_string = True
+                self._chars = []
+            elif char in '{[':
+                self._open(char)
+            elif char in '}]':
+                self.closed.add(tuple(key for _, key in self._stack[:-1] if key is not None))
+                self._stack.pop()
+                self._expect_key = bool(self._stack) and self._stack[-1][0] == '{'
+            elif char == ',':
+                self._expect_key = self._stack[-1][0] == '{'
+            elif char == ':':
+                self._expect_key = False
+        return completed
+
+    def flush(self) -> List[Path]:
+        """Commit a string that closed right at the end of the input."""
+        path = self._commit() if self._pending is not None else None
+        return [path] if path else []
+
+    def _string_char(self, char: str):
+        if self._escape:
+            self._escape = False
+        elif char == '\\':
+            self._escape = True
+        elif char == '"':
+            # Held back until the next significant character shows the quote really ended the string
+            self._in_string = False
+            self._pending = ''.join(self._chars)
+            self._gap = []
+            return
+        self._chars.append(char)
+
+    def _commit(self):
+        raw, self._pending = self._pending, None
+        return self._close_string(self._decode(raw))
+
+    @staticmethod
+    def _decode(raw: str) -> str:
+        # Models sometimes emit raw newlines or invalid escapes such as \q; keep the text rather than fail
+        try:
+            return json.loads('"' + raw + '"', strict=False)
+        except json.JSONDecodeError:
+            return raw
+
+    def _open(self, kind: str):
+        self._stack.append([kind, None])
+        self._expect_key = kind == '{'
+
+    def _path(self) -> Path:
+        return tuple(key for _, key in self._stack if key is not None)
+
+    def _close_string(self, value: str):
+        frame = self._stack[-1]
+        if frame[0] == '{' and self._expect_key:
+            frame[1] = value
+            return None
+        # Only members of nested objects, or items of an array that is such a member
+        if any(kind != '{' for kind, _ in self._stack[:-1]):
+            return None
+        path = self._path()
+        if not path or path in self.corrupt:
+            return None
+        node = self.values
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+            if not isinstance(node, dict):
+                return None
+        if frame[0] == '[':
+            items = node.setdefault(path[-1], [])
+            if isinstance(items, list):
+                items.append(value)
+            return None
+        if path[-1] in node:
+            logger.warning(f"Field {'.'.join(path)} appears twice in JSON, dropping it")
+            del node[path[-1]]
+            self.corrupt.add(path)
+            return None
+        node[path[-1]] = value
+        return path
+
+def salvage_json(text: str) -> Tuple[Dict[str, Any], Set[Path]]:
+    """Recover the complete string fields (and closed string arrays' paths) from broken JSON.
+
+    >>> salvage_json('{"es": {"title": "El "mejor" desayuno", "hashtags": "#a')[0]
+    {'es': {'title': 'El "mejor" desayuno'}}
+    """
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    parser.flush()
+    return parser.values, parser.closed
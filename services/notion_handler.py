@@ -1,5 +1,6 @@
 from notion_client import Client
 from config.config import Config
+from models.idea import Idea
 
 class NotionHandler:
     """Handles Notion API operations for content management."""
@@ -26,10 +27,10 @@ class NotionHandler:
                 return prop_name
         return 'Name'  # fallback
 
-    def create_content_page(self, ideas: dict, category: str):
+    def create_content_page(self, ideas: Idea, category: str):
         """Create a new page in Notion with the generated content."""
         # Get the title from the Spanish version (assuming it's the primary)
-        page_title = ideas.get('es', {}).get('title', f'Content for {category}')
+        page_title = ideas.es.title if ideas.es else f'Content for {category}'
         
         # Create page properties
         properties = {
@@ -91,7 +92,7 @@ class NotionHandler:
         )
         return page
 
-    def _create_styled_guion_blocks(self, idea_data: dict) -> list:
+    def _create_styled_guion_blocks(self, idea_data: Idea) -> list:
         """Create styled Notion blocks for the guion content."""
         blocks = []
 
@@ -111,7 +112,7 @@ class NotionHandler:
             }
         })
         if 'es' in idea_data:
-            es = idea_data['es']
+            es = idea_data.es
             blocks.append({
                 "object": "block",
                 "type": "heading_2",
@@ -136,7 +137,7 @@ class NotionHandler:
                         {
                             "type": "text",
                             "text": {
-                                "content": f"🎯 Título: {es.get('title', '')}"
+                                "content": f"🎯 Título: {es.title}"
                             },
                             "annotations": {
                                 "bold": True
@@ -147,8 +148,8 @@ class NotionHandler:
             })
 
             # Script sections
-            if 'script' in es:
-                script = es['script']
+            if es.script:
+                script = es.script
                 blocks.append({
                     "object": "block",
                     "type": "heading_3",
@@ -182,7 +183,7 @@ class NotionHandler:
                             {
                                 "type": "text",
                                 "text": {
-                                    "content": script.get('gancho', '')
+                                    "content": script.hook
                                 }
                             }
                         ]
@@ -207,7 +208,7 @@ class NotionHandler:
                             {
                                 "type": "text",
                                 "text": {
-                                    "content": script.get('cuerpo', '')
+                                    "content": script.body
                                 }
                             }
                         ]
@@ -232,7 +233,7 @@ class NotionHandler:
                             {
                                 "type": "text",
                                 "text": {
-                                    "content": script.get('cierre', '')
+                                    "content": script.closing
                                 }
                             }
                         ]
@@ -240,7 +241,7 @@ class NotionHandler:
                 })
 
             # Video prompts (ES) - justo después del guion en español
-            if 'video_prompts' in es and es['video_prompts']:
+            if es.video_prompts:
                 blocks.append({
                     "object": "block",
                     "type": "heading_3",
@@ -256,7 +257,7 @@ class NotionHandler:
                     }
                 })
 
-                for i, prompt in enumerate(es['video_prompts'], 1):
+                for i, prompt in enumerate(es.video_prompts, 1):
                     blocks.append({
                         "object": "block",
                         "type": "bulleted_list_item",
@@ -273,7 +274,7 @@ class NotionHandler:
                     })
 
             # Hashtags
-            if es.get('hashtags'):
+            if es.hashtags:
                 blocks.append({
                     "object": "block",
                     "type": "heading_3",
@@ -297,7 +298,7 @@ class NotionHandler:
                             {
                                 "type": "text",
                                 "text": {
-                                    "content": es['hashtags']
+                                    "content": es.hashtags
                                 },
                                 "annotations": {
                                     "code": True
@@ -308,7 +309,7 @@ class NotionHandler:
                 })
 
             # Español - links de imágenes y videos de Pexels
-            if 'pexels_images' in es and es['pexels_images']:
+            if es.pexels_images:
                 blocks.append({
                     "object": "block",
                     "type": "heading_3",
@@ -323,7 +324,7 @@ class NotionHandler:
                         ]
                     }
                 })
-                for img_url in es['pexels_images']:
+                for img_url in es.pexels_images:
                     # Add the image block
                     blocks.append({
                         "object": "block",
@@ -354,7 +355,7 @@ class NotionHandler:
                             ]
                         }
                     })
-            if 'pexels_videos' in es and es['pexels_videos']:
+            if es.pexels_videos:
                 blocks.append({
                     "object": "block",
                     "type": "heading_3",
@@ -369,7 +370,7 @@ class NotionHandler:
                         ]
                     }
                 })
-                for vid_url in es['pexels_videos']:
+                for vid_url in es.pexels_videos:
                     # Add the video block
                     blocks.append({
                         "object": "block",
@@ -403,7 +404,7 @@ class NotionHandler:
 
         # English version
         if 'en' in idea_data:
-            en = idea_data['en']
+            en = idea_data.en
             blocks.append({
                 "object": "block",
                 "type": "heading_2",
@@ -428,7 +429,7 @@ class NotionHandler:
                         {
                             "type": "text",
                             "text": {
-                                "content": f"🎯 Title: {en.get('title', '')}"
+                                "content": f"🎯 Title: {en.title}"
                             },
                             "annotations": {
                                 "bold": True
@@ -439,8 +440,8 @@ class NotionHandler:
             })
 
             # Script sections
-            if 'script' in en:
-                script = en['script']
+            if en.script:
+                script = en.script
                 blocks.append({
                     "object": "block",
                     "type": "heading_3",
@@ -474,7 +475,7 @@ class NotionHandler:
                             {
                                 "type": "text",
                                 "text": {
-                                    "content": script.get('gancho', '')
+                                    "content": script.hook
                                 }
                             }
                         ]
@@ -499,7 +500,7 @@ class NotionHandler:
                             {
                                 "type": "text",
                                 "text": {
-                                    "content": script.get('cuerpo', '')
+                                    "content": script.body
                                 }
                             }
                         ]
@@ -524,7 +525,7 @@ class NotionHandler:
                             {
                                 "type": "text",
                                 "text": {
-                                    "content": script.get('cierre', '')
+                                    "content": script.closing
                                 }
                             }
                         ]
@@ -532,7 +533,7 @@ class NotionHandler:
                 })
 
             # Video prompts (EN) - justo después del guion en inglés
-            if 'video_prompts' in en and en['video_prompts']:
+            if en.video_prompts:
                 blocks.append({
                     "object": "block",
                     "type": "heading_3",
@@ -548,7 +549,7 @@ class NotionHandler:
                     }
                 })
 
-                for i, prompt in enumerate(en['video_prompts'], 1):
+                for i, prompt in enumerate(en.video_prompts, 1):
                     blocks.append({
                         "object": "block",
                         "type": "bulleted_list_item",
@@ -565,7 +566,7 @@ class NotionHandler:
                     })
 
             # Hashtags
-            if en.get('hashtags'):
+            if en.hashtags:
                 blocks.append({
                     "object": "block",
                     "type": "heading_3",
@@ -589,7 +590,7 @@ class NotionHandler:
                             {
                                 "type": "text",
                                 "text": {
-                                    "content": en['hashtags']
+                                    "content": en.hashtags
                                 },
                                 "annotations": {
                                     "code": True
@@ -600,7 +601,7 @@ class NotionHandler:
                 })
 
             # Inglés - links de imágenes y videos de Pexels
-            if 'pexels_images' in en and en['pexels_images']:
+            if en.pexels_images and idea_data.own_media('en'):
                 blocks.append({
                     "object": "block",
                     "type": "heading_3",
@@ -615,7 +616,7 @@ class NotionHandler:
                         ]
                     }
                 })
-                for img_url in en['pexels_images']:
+                for img_url in en.pexels_images:
                     # Add the image block
                     blocks.append({
                         "object": "block",
@@ -646,7 +647,7 @@ class NotionHandler:
                             ]
                         }
                     })
-            if 'pexels_videos' in en and en['pexels_videos']:
+            if en.pexels_videos and idea_data.own_media('en'):
                 blocks.append({
                     "object": "block",
                     "type": "heading_3",
@@ -661,7 +662,7 @@ class NotionHandler:
                         ]
                     }
                 })
-                for vid_url in en['pexels_videos']:
+                for vid_url in en.pexels_videos:
                     # Add the video block
                     blocks.append({
                         "object": "block",
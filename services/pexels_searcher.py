@@ -1,33 +1,219 @@
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 import requests
+from requests.adapters import HTTPAdapter
 from config.config import Config
+from services.search_cache import SearchCache, normalize_query
+from services.video_selector import VideoProfile, select_renditions
+
+logger = logging.getLogger(__name__)
+
+def plan_queries(prompts: Dict[str, str], prefer: Optional[str] = 'en') -> List[str]:
+    """Distinct normalized queries to run for one idea, preferred language first.
+
+    With a preferred language only its prompt is searched (falling back to the
+    others if it is empty); with prefer=None every distinct prompt is searched.
+    """
+    ordered = sorted(prompts, key=lambda lang: lang != prefer)
+    queries = []
+    for lang in ordered:
+        query = normalize_query(prompts[lang] or "")
+        if query and query not in queries:
+            queries.append(query)
+    return queries[:1] if prefer else queries
+
+_STOPWORDS = {
+    # en
+    'a', 'an', 'the', 'of', 'in', 'on', 'at', 'to', 'for', 'with', 'and', 'or', 'is', 'are', 'as', 'by',
+    'from', 'into', 'while', 'their', 'his', 'her', 'its', 'this', 'that', 'shot', 'close', 'up', 'closeup',
+    'camera', 'video', 'scene', 'slow', 'motion', 'showing', 'shows', 'view', 'angle', 'footage', 'clip',
+    # es
+    'un', 'una', 'el', 'la', 'los', 'las', 'de', 'del', 'en', 'con', 'y', 'o', 'por', 'para', 'que', 'se',
+    'su', 'sus', 'al', 'plano', 'toma', 'cámara', 'escena', 'primer', 'lenta', 'mostrando',
+}
+
+def shot_query(prompt: str, max_words: int = 4) -> str:
+    """Short stock-footage query from a detailed video prompt: its first content words."""
+    words = re.findall(r"[^\W\d_]+", prompt.casefold())
+    return " ".join([word for word in words if word not in _STOPWORDS and len(word) > 2][:max_words])
+
+def _merge_by_id(result_lists: Iterable[List[Dict[str, Any]]], limit: int, skip: Callable[[Any], bool] = None) -> List[Dict[str, Any]]:
+    """Merge results without repeated ids; items `skip` flags only fill in if there aren't enough others."""
+    ids = set()
+    merged = []
+    skipped = []
+    for results in result_lists:
+        for item in results:
+            if item["id"] in ids:
+                continue
+            ids.add(item["id"])
+            (skipped if skip and skip(item["id"]) else merged).append(item)
+    return (merged + skipped)[:limit]
 
 class PexelsSearcher:
-    """Searches images and videos using Pexels API."""
+    """Searches images and videos using Pexels API.
+
+    Meant to be long-lived: the session keeps TLS connections to Pexels open
+    between generations and the searches of one idea run concurrently.
+    Responses are cached; when the remaining quota reported by Pexels drops
+    below the reserve, stale cached results are served instead of calling the API.
+    """
     BASE_URL = "https://api.pexels.com/v1/"
     VIDEO_URL = "https://api.pexels.com/videos/"
 
-    def __init__(self):
+    def __init__(self, pool_size: int = None, timeout: float = None, cache: SearchCache = None, video_profile: VideoProfile = None, prefer_language: str = None, shot_concurrency: int = None):
         self.api_key = Config.get_pexels_token()
         self.headers = {"Authorization": self.api_key}
+        pool_size = pool_size or Config.get_pexels_pool_size()
+        self.timeout = (Config.get_pexels_connect_timeout(), timeout or Config.get_pexels_timeout())
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="pexels")
+        # Shot searches come in bursts of up to ~10; their own pool keeps them from starving idea searches
+        self._shot_executor = ThreadPoolExecutor(
+            max_workers=shot_concurrency or Config.get_shot_search_concurrency(), thread_name_prefix="pexels-shot"
+        )
+        self.cache = cache or SearchCache(
+            Config.get_pexels_cache_path(),
+            ttl=Config.get_pexels_cache_ttl(),
+            memory_size=Config.get_pexels_cache_memory(),
+            max_rows=Config.get_pexels_cache_max_rows()
+        )
+        self.quota_reserve = Config.get_pexels_quota_reserve()
+        prefer_language = prefer_language or Config.get_pexels_search_language()
+        self.overfetch = Config.get_seen_media_overfetch()
+        self.prefer_language = None if prefer_language == 'all' else prefer_language
+        self.video_profile = video_profile or VideoProfile(
+            orientation=Config.get_video_orientation() or None,
+            resolution=Config.get_video_resolution(),
+            max_duration=Config.get_video_max_duration()
+        )
+        self._quota_lock = threading.Lock()
+        self._quota_remaining = None
+        self._quota_reset = 0.0
 
-    def search_images(self, query, per_page=3, orientation=None):
+    def _quota_low(self) -> bool:
+        with self._quota_lock:
+            if self._quota_remaining is None or time.time() >= self._quota_reset:
+                return False
+            return self._quota_remaining <= self.quota_reserve
+
+    def _track_quota(self, response):
+        remaining = response.headers.get("X-Ratelimit-Remaining")
+        reset = response.headers.get("X-Ratelimit-Reset")
+        with self._quota_lock:
+            if response.status_code == 429:
+                self._quota_remaining = 0
+            elif remaining is not None:
+                self._quota_remaining = int(remaining)
+            if reset is not None:
+                self._quota_reset = float(reset)
+            elif response.status_code == 429:
+                self._quota_reset = time.time() + 60
+
+    def _get(self, endpoint, url, params):
+        key = SearchCache.key(endpoint, params["query"], params["per_page"], params.get("orientation"))
+        cached, fresh = self.cache.get(key)
+        if cached is not None and (fresh or self._quota_low()):
+            return cached
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning(f"Pexels request failed ({url}): {e}")
+            return cached
+        self._track_quota(response)
+        if response.status_code == 200:
+            data = response.json()
+            self.cache.set(key, data)
+            return data
+        logger.warning(f"Pexels returned {response.status_code} for {url}")
+        return cached
+
+    def search_image_files(self, query, per_page=3, orientation=None) -> List[Dict[str, Any]]:
         url = f"{self.BASE_URL}search"
         params = {"query": query, "per_page": per_page}
         if orientation:
             params["orientation"] = orientation  # portrait, landscape, square
-        response = requests.get(url, headers=self.headers, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            return [photo["src"]["medium"] for photo in data.get("photos", [])]
+        data = self._get("photos", url, params)
+        if data:
+            return [{"id": photo["id"], "link": photo["src"]["medium"]} for photo in data.get("photos", [])]
         return []
 
-    def search_videos(self, query, per_page=2, orientation=None):
+    def search_images(self, query, per_page=3, orientation=None):
+        return [photo["link"] for photo in self.search_image_files(query, per_page, orientation)]
+
+    def search_video_files(self, query, per_page=2, orientation=None) -> List[Dict[str, Any]]:
+        """Search videos and pick the rendition of each that best fits the video profile (link + metadata)."""
         url = f"{self.VIDEO_URL}search"
         params = {"query": query, "per_page": per_page}
         if orientation:
             params["orientation"] = orientation  # portrait, landscape, square
-        response = requests.get(url, headers=self.headers, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            return [video["video_files"][0]["link"] for video in data.get("videos", [])]
+        data = self._get("videos", url, params)
+        if data:
+            return select_renditions(data.get("videos", []), self.video_profile)
         return []
+
+    def search_videos(self, query, per_page=2, orientation=None):
+        return [video["link"] for video in self.search_video_files(query, per_page, orientation)]
+
+    def search_media(self, prompts: Dict[str, str], images=2, videos=8, orientation=None, seen_images: Callable[[Any], bool] = None, seen_videos: Callable[[Any], bool] = None) -> Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """Search media for one idea's per-language prompts; returns {lang: (image_files, video_files)}.
+
+        The prompts are planned into distinct queries (see plan_queries), all
+        searches run at once, and results are merged by Pexels id, so every
+        language gets the same media. With `seen_*` predicates each search
+        over-fetches and media the user was already shown goes last.
+        """
+        if seen_images or seen_videos:
+            fetch_images, fetch_videos = images * self.overfetch, videos * self.overfetch
+        else:
+            fetch_images, fetch_videos = images, videos
+        queries = plan_queries(prompts, self.prefer_language)
+        if not queries:
+            return {}
+        futures = [
+            (
+                self._executor.submit(self.search_image_files, query, fetch_images, orientation),
+                self._executor.submit(self.search_video_files, query, fetch_videos, orientation)
+            )
+            for query in queries
+        ]
+        image_files = _merge_by_id((image_future.result() for image_future, _ in futures), images, seen_images)
+        video_files = _merge_by_id((video_future.result() for _, video_future in futures), videos, seen_videos)
+        return {lang: (list(image_files), list(video_files)) for lang, prompt in prompts.items() if prompt}
+
+    def search_shots(self, video_prompts: List[str], budget: float, orientation='portrait', seen: Callable[[Any], bool] = None) -> List[Optional[Dict[str, Any]]]:
+        """One clip per video prompt (None where nothing was found in time), within `budget` seconds.
+
+        Prompts that reduce to the same query share one search; a clip already
+        picked for an earlier shot is skipped if the search offered another.
+        """
+        queries = [shot_query(prompt) for prompt in video_prompts]
+        futures = {query: self._shot_executor.submit(self.search_video_files, query, 3, orientation) for query in dict.fromkeys(queries) if query}
+        done, pending = wait(futures.values(), timeout=budget)
+        for future in pending:
+            future.cancel()
+        if pending:
+            logger.info(f"Shot search budget of {budget}s ran out with {len(pending)} of {len(futures)} searches pending")
+        used = set()
+        shots = []
+        for query in queries:
+            future = futures.get(query)
+            candidates = future.result() if future in done and not future.exception() else []
+            fresh = [c for c in candidates if c["id"] not in used]
+            clip = next((c for c in fresh if not (seen and seen(c["id"]))), fresh[0] if fresh else (candidates[0] if candidates else None))
+            if clip:
+                used.add(clip["id"])
+            shots.append(clip)
+        return shots
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self._shot_executor.shutdown(wait=False)
+        self.session.close()
+        self.cache.close()
@@ -0,0 +1,78 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+class SearchCache:
+    """Two-tier cache of raw Pexels search responses: in-memory LRU in front of SQLite.
+
+    Entries older than `ttl` are stale but kept (until size eviction) so they
+    can still be served when the API quota runs low or a request fails.
+    """
+
+    def __init__(self, path: str, ttl: float, memory_size: int = 256, max_rows: int = 5000):
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+        self._memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache (key TEXT PRIMARY KEY, body TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_stored ON search_cache (stored_at)")
+
+    @staticmethod
+    def key(endpoint: str, query: str, per_page: int, orientation: Optional[str]) -> str:
+        return f"{endpoint}|{normalize_query(query)}|{per_page}|{orientation or ''}"
+
+    def get(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Return (data, fresh); data is None on a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            else:
+                row = self._db.execute("SELECT body, stored_at FROM search_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None, False
+                entry = (json.loads(row[0]), row[1])
+                self._remember(key, entry)
+        data, stored_at = entry
+        return data, time.time() - stored_at < self.ttl
+
+    def set(self, key: str, data: Any):
+        entry = (data, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, body, stored_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(data), entry[1])
+                )
+                self._writes += 1
+                # Trimming needs a count, so only do it every so often
+                if self._writes % 100 == 0:
+                    self._db.execute(
+                        "DELETE FROM search_cache WHERE key IN "
+                        "(SELECT key FROM search_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_rows,)
+                    )
+
+    def _remember(self, key: str, entry: Tuple[Any, float]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
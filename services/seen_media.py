@@ -0,0 +1,85 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+from database.database import DatabaseHandler
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys (double hashing on one blake2b digest)."""
+
+    def __init__(self, num_bits: int = 32768, num_hashes: int = 7, data: Optional[bytes] = None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray(data) if data else bytearray(num_bits // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def fill_ratio(self) -> float:
+        return int.from_bytes(self.bits, 'little').bit_count() / self.num_bits
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.bits)
+
+class SeenMediaIndex:
+    """Per-user set of Pexels media already suggested, as a 4 KB Bloom filter.
+
+    Filters are loaded from user_seen_media the first time a user generates
+    and kept in memory (LRU); lookups never touch the database. Once a filter
+    is half full (~3000 items, false positives climbing) it starts over.
+    """
+
+    def __init__(self, db_handler: DatabaseHandler, num_bits: int = 32768, num_hashes: int = 7, max_users: int = 1000):
+        self.db_handler = db_handler
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.max_users = max_users
+        self._filters: "OrderedDict[int, BloomFilter]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind: str, media_id) -> str:
+        # Photo and video ids are separate sequences in Pexels
+        return f"{kind}:{media_id}"
+
+    def _filter(self, user_id: int) -> BloomFilter:
+        with self._lock:
+            bloom = self._filters.get(user_id)
+            if bloom is not None:
+                self._filters.move_to_end(user_id)
+                return bloom
+        data = self.db_handler.get_seen_media(user_id)
+        if data is not None and len(data) * 8 != self.num_bits:
+            data = None
+        bloom = BloomFilter(self.num_bits, self.num_hashes, data)
+        with self._lock:
+            bloom = self._filters.setdefault(user_id, bloom)
+            while len(self._filters) > self.max_users:
+                self._filters.popitem(last=False)
+        return bloom
+
+    def seen(self, user_id: int, kind: str):
+        """Predicate for one user: seen(media_id) -> bool."""
+        bloom = self._filter(user_id)
+        return lambda media_id: self.key(kind, media_id) in bloom
+
+    def mark(self, user_id: int, kind: str, media_ids: Iterable):
+        bloom = self._filter(user_id)
+        if bloom.fill_ratio() > 0.5:
+            bloom.bits = bytearray(self.num_bits // 8)
+        for media_id in media_ids:
+            bloom.add(self.key(kind, media_id))
+
+    def save(self, user_id: int):
+        """Persist the user's filter (one write per generation)."""
+        self.db_handler.save_seen_media(user_id, self._filter(user_id).to_bytes())
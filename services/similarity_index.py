@@ -0,0 +1,91 @@
+import threading
+import zlib
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import numpy as np
+from database.database import DatabaseHandler
+
+def ngram_vector(text: str, dim: int, n: int = 3) -> np.ndarray:
+    """L2-normalized hashed character n-gram counts of `text`."""
+    text = f" {' '.join(text.casefold().split())} "
+    if len(text) < n:
+        return np.zeros(dim, dtype=np.float32)
+    buckets = [zlib.crc32(text[i:i + n].encode('utf-8')) % dim for i in range(len(text) - n + 1)]
+    vector = np.bincount(buckets, minlength=dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+class TitleIndex:
+    """Vectors of one user's ideas in one category; rows grow in place as ideas are added."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.titles: List[str] = []
+        self._vectors = np.zeros((16, dim), dtype=np.float32)
+
+    def vector(self, title: str, script: str) -> np.ndarray:
+        # Title and script weigh the same, whatever their lengths
+        combined = ngram_vector(title, self.dim) + ngram_vector(script, self.dim)
+        norm = np.linalg.norm(combined)
+        return combined / norm if norm else combined
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:len(self.titles)]
+
+    def add(self, title: str, script: str):
+        if len(self.titles) == len(self._vectors):
+            self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+        self._vectors[len(self.titles)] = self.vector(title, script)
+        self.titles.append(title)
+
+    def nearest(self, title: str, script: str) -> Tuple[float, Optional[str]]:
+        """Highest cosine similarity to a past idea, and that idea's title."""
+        if not self.titles:
+            return 0.0, None
+        scores = self.vectors @ self.vector(title, script)
+        best = int(np.argmax(scores))
+        return float(scores[best]), self.titles[best]
+
+    def representative(self, k: int) -> List[str]:
+        """The k titles closest to the category's centroid: the kind of idea most likely to come up again."""
+        if len(self.titles) <= k:
+            return list(self.titles)
+        vectors = self.vectors
+        scores = vectors @ vectors.mean(axis=0)
+        top = np.argpartition(-scores, k)[:k]
+        return [self.titles[i] for i in top[np.argsort(-scores[top])]]
+
+class SimilarityIndex:
+    """Per-user, per-category TitleIndex, loaded from the database once and then updated on insert.
+
+    Dropped when the category is renamed, merged or deleted (through either
+    database handler, which share the CategoryCache).
+    """
+
+    def __init__(self, db_handler: DatabaseHandler, dim: int = 1024, max_indexes: int = 256):
+        self.db_handler = db_handler
+        self.dim = dim
+        self.max_indexes = max_indexes
+        self._indexes: "OrderedDict[Tuple[int, str], TitleIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        db_handler.category_cache.subscribe(self.invalidate)
+
+    def invalidate(self, user_id: int, category: str):
+        with self._lock:
+            self._indexes.pop((user_id, category.casefold()), None)
+
+    def get(self, user_id: int, category: str) -> TitleIndex:
+        key = (user_id, category.casefold())
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+        index = TitleIndex(self.dim)
+        for title, script in self.db_handler.get_idea_texts(user_id, category):
+            index.add(title, script)
+        with self._lock:
+            index = self._indexes.setdefault(key, index)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
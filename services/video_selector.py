@@ -0,0 +1,73 @@
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+# Rough H.264 bits per pixel per frame, used when Pexels doesn't report a file size
+_BITS_PER_PIXEL = 0.1
+_DEFAULT_FPS = 30.0
+
+class VideoProfile:
+    """Rendition we want for each clip: orientation, short-side resolution and max duration."""
+
+    def __init__(self, orientation: Optional[str] = 'portrait', resolution: int = 720, max_duration: float = 15):
+        self.orientation = orientation
+        self.resolution = resolution
+        self.max_duration = max_duration
+
+def _orientation_ok(width: np.ndarray, height: np.ndarray, orientation: Optional[str]) -> np.ndarray:
+    if orientation == 'portrait':
+        return height > width
+    if orientation == 'landscape':
+        return width > height
+    if orientation == 'square':
+        ratio = width / np.maximum(height, 1)
+        return (ratio > 0.9) & (ratio < 1.1)
+    return np.ones(width.shape, dtype=bool)
+
+def select_renditions(videos: List[Dict[str, Any]], profile: VideoProfile) -> List[Dict[str, Any]]:
+    """Pick one file per Pexels video, the lightest that fits the profile.
+
+    All files of all videos in the response are ranked in one pass: files with
+    the right orientation and at least the target resolution come first
+    (smallest size wins), then the right orientation below the target (largest
+    wins), then everything else. Videos within max_duration keep their Pexels
+    order ahead of longer ones.
+    """
+    rows = [(v, f) for v, video in enumerate(videos) for f in video.get("video_files") or [] if f.get("link")]
+    if not rows:
+        return []
+    video_idx = np.array([v for v, _ in rows])
+    width = np.array([f.get("width") or 0 for _, f in rows], dtype=float)
+    height = np.array([f.get("height") or 0 for _, f in rows], dtype=float)
+    fps = np.array([f.get("fps") or _DEFAULT_FPS for _, f in rows], dtype=float)
+    size = np.array([f.get("size") or np.nan for _, f in rows], dtype=float)
+    duration = np.array([videos[v].get("duration") or 0 for v in video_idx], dtype=float)
+
+    estimated = np.isnan(size)
+    size = np.where(estimated, width * height * fps * duration * _BITS_PER_PIXEL / 8, size)
+    short_side = np.minimum(width, height)
+    oriented = _orientation_ok(width, height, profile.orientation)
+    tier = np.where(oriented & (short_side >= profile.resolution), 0, np.where(oriented, 1, 2))
+    cost = np.where(tier == 1, -short_side, size)
+
+    order = np.lexsort((cost, tier, video_idx))
+    _, first = np.unique(video_idx[order], return_index=True)
+    best = order[first]
+    # Stable: clips that are short enough first, otherwise in Pexels' relevance order
+    best = best[np.argsort(duration[best] > profile.max_duration, kind="stable")]
+
+    selected = []
+    for i in best:
+        v, video_file = rows[i]
+        video = videos[v]
+        selected.append({
+            "id": video.get("id"),
+            "link": video_file["link"],
+            "width": int(width[i]),
+            "height": int(height[i]),
+            "fps": float(fps[i]),
+            "duration": float(duration[i]),
+            "size": int(size[i]),
+            "size_estimated": bool(estimated[i]),
+            "quality": video_file.get("quality"),
+        })
+    return selected